@@ -0,0 +1,98 @@
+from datetime import datetime
+from functools import cached_property
+
+from events import EventLog
+from issue_table import IssueTable
+from issues import normalize_combined, normalize_issues
+from sketches import DurationSketches
+from windows import current_windows
+
+
+class AnalysisContext:
+    """
+    Everything the charts and spreadsheets derive from the normalized issues,
+    built once per run: the open and closed masks, label masks and counts,
+    the label index, the timeline event log, the duration sketches and the
+    stored windows.
+    """
+
+    def __init__(self, issues, target_labels=(), as_of=None, windows=None, target_repos=()):
+        if not isinstance(issues, IssueTable):
+            raise TypeError("AnalysisContext expects the IssueTable from normalize_issues")
+
+        self.issues = issues
+        self.labels = issues.labels
+        # The labels the issues were collected by, which every issue carries
+        self.target_labels = list(target_labels)
+        # The repos they were collected from
+        self.target_repos = list(target_repos)
+        # The date the rolling windows end at
+        self.as_of = as_of or datetime.now()
+        # The stored `windows.WindowAggregator` of the issues, when current
+        self.windows = windows
+        self._label_masks = {}
+
+    def __len__(self):
+        return len(self.issues)
+
+    @cached_property
+    def open_mask(self):
+        return self.issues.open_mask
+
+    @cached_property
+    def closed_mask(self):
+        return self.issues.closed_mask
+
+    @cached_property
+    def open_label_counts(self):
+        return self.issues.label_counts(self.open_mask)
+
+    @cached_property
+    def label_index(self):
+        return self.issues.label_index
+
+    @cached_property
+    def events(self):
+        return EventLog(self.issues)
+
+    @cached_property
+    def duration_sketches(self):
+        return DurationSketches.from_issues(self.issues, self.events)
+
+    def label_mask(self, name):
+        if name not in self._label_masks:
+            self._label_masks[name] = self.issues.label_mask(name)
+
+        return self._label_masks[name]
+
+
+def analysis_contexts(collection, snapshots, as_of=None):
+    """
+    The contexts to report on, keyed by output prefix: the combined targets
+    of the collection unprefixed and/or each target under `<name>/`.
+    """
+    targets = collection["targets"]
+    as_of = as_of or datetime.now()
+    contexts = {}
+
+    if "combined" in collection["aggregate"]:
+        contexts[""] = AnalysisContext(
+            normalize_combined([snapshots[target["name"]] for target in targets]),
+            sorted({target["label"] for target in targets}),
+            as_of,
+            # Several targets' windows can't be merged: they may share issues
+            current_windows(targets[0]) if len(targets) == 1 else None,
+            sorted({target["repo"] for target in targets}),
+        )
+
+    if "per-target" in collection["aggregate"]:
+        for target in targets:
+            contexts[f"{target['name']}/"] = AnalysisContext(
+                normalize_issues(snapshots[target["name"]]),
+                [target["label"]],
+                as_of,
+                current_windows(target),
+                [target["repo"]],
+            )
+
+    return contexts
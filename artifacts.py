@@ -0,0 +1,131 @@
+import csv
+import hashlib
+import io
+import json
+import os
+import re
+import zipfile
+
+from openpyxl import Workbook
+
+MANIFEST_PATH = "artifacts.json"
+
+# Fixed timestamp written into xlsx files so identical data gives identical bytes
+STABLE_ZIP_DATE = (2000, 1, 1, 0, 0, 0)
+STABLE_CORE_DATE = "2000-01-01T00:00:00Z"
+
+
+def load_manifest(path=MANIFEST_PATH):
+    if not os.path.exists(path):
+        return {}
+
+    with open(path, "r") as json_file:
+        return json.load(json_file)
+
+
+def save_manifest(manifest, path=MANIFEST_PATH):
+    with open(path, "w") as json_file:
+        json.dump(manifest, json_file, indent=2, sort_keys=True)
+        json_file.write("\n")
+
+
+def data_digest(data):
+    """
+    Hash a chart's aggregated data: its table (column order included) plus
+    any other plotting inputs.
+    """
+    digest = hashlib.sha256()
+
+    digest.update(json.dumps(list(data["table"])).encode())
+    digest.update(json.dumps(data, sort_keys=True, default=str).encode())
+
+    return digest.hexdigest()
+
+
+def artifacts_exist(paths):
+    return all(os.path.exists(path) for path in paths)
+
+
+def write_if_changed(path, content):
+    """
+    Write bytes to path unless the file already holds exactly those bytes.
+    Returns whether the file was written.
+    """
+    if os.path.exists(path):
+        with open(path, "rb") as existing_file:
+            if existing_file.read() == content:
+                return False
+
+    with open(path, "wb") as output_file:
+        output_file.write(content)
+
+    return True
+
+
+def stable_xlsx_bytes(xlsx_bytes):
+    """
+    Re-pack an xlsx archive with fixed entry timestamps and fixed document
+    created/modified dates, so the same cells always produce the same bytes.
+    """
+    output = io.BytesIO()
+
+    with zipfile.ZipFile(io.BytesIO(xlsx_bytes)) as source, zipfile.ZipFile(
+        output, "w", zipfile.ZIP_DEFLATED
+    ) as target:
+        for entry in source.infolist():
+            content = source.read(entry.filename)
+
+            if entry.filename == "docProps/core.xml":
+                content = re.sub(
+                    rb"(<dcterms:(?:created|modified)[^>]*>)[^<]*",
+                    rb"\g<1>" + STABLE_CORE_DATE.encode(),
+                    content,
+                )
+
+            info = zipfile.ZipInfo(entry.filename, date_time=STABLE_ZIP_DATE)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            info.external_attr = entry.external_attr
+            target.writestr(info, content)
+
+    return output.getvalue()
+
+
+def table_rows(table):
+    """
+    The header and then the rows of a table, a dict of column name to values.
+    """
+    yield list(table)
+    yield from zip(*table.values())
+
+
+def write_csv(table, path_base):
+    """
+    Write a table to `<path_base>.csv`, leaving the file untouched when its
+    content would not change.
+    """
+    os.makedirs(os.path.dirname(path_base) or ".", exist_ok=True)
+
+    output = io.StringIO()
+    csv.writer(output, lineterminator="\n").writerows(table_rows(table))
+    write_if_changed(f"{path_base}.csv", output.getvalue().encode("utf-8"))
+
+
+def write_workbook(sheets, path):
+    """
+    Stream every table of `sheets` ({sheet name: table}) into one byte-stable
+    xlsx workbook, a sheet each. Write-only mode serializes rows as they are
+    appended instead of keeping a cell object per value.
+    """
+    workbook = Workbook(write_only=True)
+
+    for title, table in sheets.items():
+        sheet = workbook.create_sheet(title)
+
+        for row in table_rows(table):
+            sheet.append(row)
+
+    xlsx_buffer = io.BytesIO()
+    workbook.save(xlsx_buffer)
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    write_if_changed(path, stable_xlsx_bytes(xlsx_buffer.getvalue()))
@@ -0,0 +1,196 @@
+"""
+Benchmark the pipeline stages on synthetic issues and compare with a baseline.
+
+    python -m benchmarks.run --issues 10000
+    python -m benchmarks.run --issues 10000 --save-baseline
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import charts
+import chunked
+import issues
+import spreadsheets
+
+from analysis import AnalysisContext
+from benchmarks.synthetic import generate_issues, search_pages
+from sketches import DurationSketches
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+# A stage is reported as a regression when it is this much slower than the baseline
+REGRESSION_THRESHOLD = 1.2
+
+
+def measure(function, repeat=1):
+    """
+    Best-of-`repeat` wall time, then one more run under tracemalloc for the
+    peak Python heap usage.
+    """
+    seconds = min(_timed(function) for _ in range(repeat))
+
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {"seconds": round(seconds, 4), "peak_mb": round(peak / 2**20, 2)}
+
+
+def _timed(function):
+    started_at = time.perf_counter()
+    function()
+
+    return time.perf_counter() - started_at
+
+
+def fetch_benchmark(raw_issues):
+    run_query = issues.run_query
+    issues.run_query = search_pages(raw_issues)
+
+    try:
+        issues.fetch_all_issues()
+    finally:
+        issues.run_query = run_query
+
+
+def render_benchmark(name, context):
+    fig = charts.plot_chart(name, context)
+    fig.tight_layout()
+    fig.savefig(f"images/{name}.png")
+    fig.clear()
+
+
+def run_benchmarks(args):
+    raw_issues = generate_issues(
+        issue_count=args.issues,
+        label_count=args.labels,
+        component_count=args.components,
+        events_per_issue=args.events,
+    )
+    table = issues.normalize_issues(raw_issues)
+
+    def new_context():
+        return AnalysisContext(table, [issues.label_v9], target_repos=[issues.repo])
+
+    context = new_context()
+
+    stages = {
+        "fetch": lambda: fetch_benchmark(raw_issues),
+        "normalize_issues": lambda: issues.normalize_issues(raw_issues),
+        "analysis_context": lambda: _warm_context(new_context()),
+    }
+
+    for name, (data_function, _) in charts.CHARTS.items():
+        stages[f"{name}:{data_function.__name__}"] = (
+            lambda data_function=data_function: data_function(context)
+        )
+        stages[f"{name}:render"] = lambda name=name: render_benchmark(name, context)
+
+    stages["duration_sketches"] = lambda: DurationSketches.from_issues(table, context.events)
+
+    for function in [
+        spreadsheets.overall_issue_stats,
+        spreadsheets.monthly_stats,
+        spreadsheets.component_stats,
+        spreadsheets.component_durations,
+        spreadsheets.monthly_durations,
+    ]:
+        stages[function.__name__] = lambda function=function: function(context)
+
+    results = {}
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        cwd = os.getcwd()
+        os.chdir(output_dir)
+        os.makedirs("images")
+        os.makedirs("spreadsheets")
+
+        try:
+            sheets = workbook_sheets(context)
+            stages["export_workbook"] = lambda: spreadsheets.export_workbook(sheets)
+
+            issues.export_json(raw_issues, "issues.json")
+            stages["chunked_partials"] = lambda: chunked.issue_partials(["issues.json"])
+
+            for name, function in stages.items():
+                results[name] = measure(function, args.repeat)
+                print(f"{name:<48} {results[name]['seconds']:>9.4f}s {results[name]['peak_mb']:>9.2f} MB")
+        finally:
+            os.chdir(cwd)
+
+    return results
+
+
+def workbook_sheets(context):
+    return {
+        **{name: charts.chart_data(name, context)["table"] for name in charts.CHARTS},
+        **{name: function(context) for name, function in spreadsheets.SPREADSHEETS.items()},
+    }
+
+
+def _warm_context(context):
+    context.open_label_counts
+    context.events
+    context.label_index
+
+
+def compare(results, baseline):
+    regressions = []
+
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+
+        ratio = result["seconds"] / max(baseline[name]["seconds"], 1e-6)
+
+        if ratio > REGRESSION_THRESHOLD:
+            regressions.append(name)
+            print(f"REGRESSION {name}: {baseline[name]['seconds']}s -> {result['seconds']}s ({ratio:.2f}x)")
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--issues", type=int, default=10000)
+    parser.add_argument("--labels", type=int, default=60)
+    parser.add_argument("--components", type=int, default=40)
+    parser.add_argument("--events", type=int, default=6, help="max timeline events per issue")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args)
+    scale_key = f"{args.issues}x{args.labels}x{args.components}x{args.events}"
+
+    baselines = {}
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r") as json_file:
+            baselines = json.load(json_file)
+
+    if args.save_baseline:
+        baselines[scale_key] = results
+
+        with open(args.baseline, "w") as json_file:
+            json.dump(baselines, json_file, indent=2, sort_keys=True)
+            json_file.write("\n")
+
+        return 0
+
+    if scale_key not in baselines:
+        print(f"No baseline for scale {scale_key}; run with --save-baseline to record one")
+        return 0
+
+    return 1 if compare(results, baselines[scale_key]) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
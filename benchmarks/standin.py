@@ -0,0 +1,259 @@
+"""
+Local stand-in for the GitHub GraphQL API, for measuring and tuning fetch
+concurrency, retries and throughput offline and reproducibly.
+
+Serve synthetic issues, an `issues.json` export or a recorded cassette:
+
+    python -m benchmarks.standin --issues 20000 --latency 0.2 --error-rate 0.02
+    python -m benchmarks.standin --from-issues data/issues.json
+    python -m benchmarks.standin --cassette data/cassette.jsonl
+
+and point the fetch at it with `GITHUB_GRAPHQL_URL=http://127.0.0.1:8765/graphql`.
+Or measure the fetch directly at several worker counts:
+
+    python -m benchmarks.standin --issues 20000 --latency 0.2 --measure 1,4,8,16
+"""
+import argparse
+import json
+import random
+import threading
+import time
+
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import issues
+
+from benchmarks.synthetic import generate_issues, search_pages
+from github_client import GraphQLClient, ReplayClient
+
+
+class StandIn:
+    """
+    Answers GraphQL queries with `respond(query)` after a simulated latency,
+    failing a share of them with transient 502/503s and keeping a GitHub-like
+    point budget that is reported in the rate-limit headers and `rateLimit`.
+    """
+
+    def __init__(
+        self,
+        respond,
+        latency=0.05,
+        jitter=0.0,
+        error_rate=0.0,
+        rate_limit=5000,
+        cost=1,
+        reset_seconds=3600,
+        seed=None,
+    ):
+        self.respond = respond
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.cost = cost
+        self.reset_seconds = reset_seconds
+        self.random = random.Random(seed)
+        self.remaining = rate_limit
+        self.reset_at = time.time() + reset_seconds
+        self.stats = {"requests": 0, "served": 0, "errors": 0, "rate_limited": 0}
+        self.lock = threading.Lock()
+
+    def _rate_limit_headers(self):
+        return {
+            "X-RateLimit-Limit": str(self.rate_limit),
+            "X-RateLimit-Remaining": str(self.remaining),
+            "X-RateLimit-Reset": str(int(self.reset_at)),
+        }
+
+    def handle(self, query):
+        """
+        Returns (status, headers, body) for one query.
+        """
+        with self.lock:
+            self.stats["requests"] += 1
+            delay = max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+            failed = self.random.random() < self.error_rate
+
+        time.sleep(delay)
+
+        with self.lock:
+            if time.time() >= self.reset_at:
+                self.remaining = self.rate_limit
+                self.reset_at = time.time() + self.reset_seconds
+
+            headers = self._rate_limit_headers()
+
+            if failed:
+                self.stats["errors"] += 1
+                return self.random.choice([502, 503]), headers, {"message": "Server Error"}
+
+            if self.remaining < self.cost:
+                self.stats["rate_limited"] += 1
+                return 403, headers, {"message": "API rate limit exceeded"}
+
+            self.remaining -= self.cost
+            self.stats["served"] += 1
+            headers = self._rate_limit_headers()
+            rate_limit = {
+                "cost": self.cost,
+                "remaining": self.remaining,
+                "resetAt": datetime.fromtimestamp(self.reset_at, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            }
+
+        try:
+            result = self.respond(query)
+        except KeyError as error:
+            return 404, headers, {"message": str(error)}
+
+        result = json.loads(json.dumps(result))
+
+        if "rateLimit" in (result.get("data") or {}):
+            result["data"]["rateLimit"] = rate_limit
+
+        return 200, headers, result
+
+
+def make_handler(standin):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            status, headers, body = standin.handle(payload["query"])
+            content = json.dumps(body).encode("utf-8")
+
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(content)))
+
+            for name, value in headers.items():
+                self.send_header(name, value)
+
+            self.end_headers()
+            self.wfile.write(content)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def start(standin, host="127.0.0.1", port=0):
+    """
+    Serve the stand-in from a background thread. Returns (server, url).
+    """
+    server = ThreadingHTTPServer((host, port), make_handler(standin))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    return server, f"http://{host}:{server.server_address[1]}/graphql"
+
+
+def measure_fetch(url, workers, requests_per_second, backoff):
+    """
+    Run the full fetch against `url` with `workers` threads.
+    """
+    client = GraphQLClient(
+        "",
+        url=url,
+        pool_size=workers,
+        backoff=backoff,
+        requests_per_second=requests_per_second,
+        burst=workers,
+    )
+    issues.client = client
+    issues.fetch_workers = workers
+    started_at = time.perf_counter()
+
+    try:
+        fetched = issues.fetch_all_issues()
+    finally:
+        issues.client = None
+        client.close()
+
+    seconds = time.perf_counter() - started_at
+
+    return {
+        "workers": workers,
+        "issues": len(fetched),
+        "seconds": round(seconds, 3),
+        "issues_per_second": round(len(fetched) / seconds),
+        "retries": client.retries,
+    }
+
+
+def responder(args):
+    if args.cassette:
+        return ReplayClient(args.cassette).run_query
+
+    if args.from_issues:
+        with open(args.from_issues, "r") as json_file:
+            return search_pages(json.load(json_file))
+
+    return search_pages(generate_issues(issue_count=args.issues, seed=args.seed))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--issues", type=int, default=10000, help="synthetic issue count")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--from-issues", help="serve the issues of an issues.json export")
+    parser.add_argument("--cassette", help="replay a cassette recorded with GITHUB_RECORD")
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="+/- seconds of latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of 502/503 responses")
+    parser.add_argument("--rate-limit", type=int, default=5000, help="points per reset window")
+    parser.add_argument("--cost", type=int, default=1, help="points per query")
+    parser.add_argument("--reset-seconds", type=float, default=3600)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--measure", help="comma-separated worker counts to measure the fetch with")
+    parser.add_argument("--requests-per-second", type=float, default=5.0)
+    parser.add_argument("--backoff", type=float, default=0.1, help="retry backoff base in seconds")
+
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    respond = responder(args)
+
+    def make_standin():
+        return StandIn(
+            respond,
+            latency=args.latency,
+            jitter=args.jitter,
+            error_rate=args.error_rate,
+            rate_limit=args.rate_limit,
+            cost=args.cost,
+            reset_seconds=args.reset_seconds,
+            seed=args.seed,
+        )
+
+    if not args.measure:
+        server, url = start(make_standin(), args.host, args.port)
+        print(f"Serving on {url}")
+
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            server.shutdown()
+
+        return
+
+    for workers in [int(value) for value in args.measure.split(",")]:
+        # A fresh stand-in per run, so every run starts with the full budget
+        standin = make_standin()
+        server, url = start(standin, args.host, 0)
+
+        try:
+            result = measure_fetch(url, workers, args.requests_per_second, args.backoff)
+        finally:
+            server.shutdown()
+
+        print(json.dumps({**result, **standin.stats}))
+
+
+if __name__ == "__main__":
+    main()
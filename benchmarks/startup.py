@@ -0,0 +1,117 @@
+"""
+Check the CLI startup time against its budget and that parsing a command
+loads none of the heavy libraries, and time the commands that only read a
+stored snapshot: `normalize`, and `chart` when every output is unchanged.
+
+    python -m benchmarks.startup [--issues 10000]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Wall time of `python cli.py <command> --help`, interpreter start included
+STARTUP_BUDGET_SECONDS = 0.15
+
+# Wall time of the commands reading a stored snapshot of `--issues` issues
+STORED_BUDGET_SECONDS = 1.0
+
+HEAVY_MODULES = ["numpy", "pandas", "matplotlib", "requests"]
+
+COMMANDS = [["--help"], ["fetch", "--help"], ["chart", "--help"], ["export", "--help"]]
+
+STORED_COMMANDS = [["normalize"], ["chart"]]
+
+
+def startup_seconds(command, repeat, cwd=None):
+    times = []
+
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        subprocess.run(
+            [sys.executable, os.path.join(ROOT, "cli.py"), *command],
+            check=True,
+            cwd=cwd,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        times.append(time.perf_counter() - started_at)
+
+    return min(times)
+
+
+def write_store(path, issue_count):
+    """
+    Store a snapshot of synthetic issues in a working directory and chart it
+    once, so that a later `chart` finds every output unchanged.
+    """
+    from benchmarks.synthetic import generate_issues
+    from snapshot import write_snapshot
+
+    os.makedirs(os.path.join(path, "data"))
+    write_snapshot(generate_issues(issue_count=issue_count), os.path.join(path, "data", "snapshot"))
+    startup_seconds(["chart"], 1, cwd=path)
+
+
+def check(command, seconds, budget):
+    over_budget = seconds > budget
+    print(f"cli.py {' '.join(command):<20} {seconds:.3f}s{'  OVER BUDGET' if over_budget else ''}")
+
+    return over_budget
+
+
+def heavy_imports():
+    """
+    Heavy modules loaded by importing the CLI and building its parser.
+    """
+    script = (
+        "import json, sys, cli; cli.build_parser(); "
+        f"print(json.dumps([name for name in {HEAVY_MODULES!r} if name in sys.modules]))"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", script], cwd=ROOT, check=True, capture_output=True, text=True
+    ).stdout
+
+    return json.loads(output)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="best-of runs per command")
+    parser.add_argument("--budget", type=float, default=STARTUP_BUDGET_SECONDS)
+    parser.add_argument("--stored-budget", type=float, default=STORED_BUDGET_SECONDS)
+    parser.add_argument("--issues", type=int, default=10000, help="issues in the stored snapshot")
+    args = parser.parse_args(argv)
+
+    failed = False
+
+    for command in COMMANDS:
+        failed = check(command, startup_seconds(command, args.repeat), args.budget) or failed
+
+    loaded = heavy_imports()
+
+    if loaded:
+        failed = True
+        print(f"Heavy modules imported at startup: {', '.join(loaded)}")
+
+    print(f"Budget: {args.budget:.3f}s")
+
+    with tempfile.TemporaryDirectory() as store:
+        write_store(store, args.issues)
+
+        for command in STORED_COMMANDS:
+            seconds = startup_seconds(command, args.repeat, cwd=store)
+            failed = check(command, seconds, args.stored_budget) or failed
+
+    print(f"Budget with {args.issues} stored issues: {args.stored_budget:.3f}s")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
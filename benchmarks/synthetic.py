@@ -0,0 +1,130 @@
+import random
+import re
+
+from datetime import datetime, timedelta
+
+from issues import (
+    label_v9,
+    label_bug,
+    label_feature,
+    label_epic,
+    label_needs_triage,
+    label_needs_backlog_grooming,
+    label_a11y,
+)
+
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+
+def label_pool(label_count, component_count):
+    labels = [
+        label_bug,
+        label_feature,
+        label_epic,
+        label_needs_triage,
+        label_needs_backlog_grooming,
+        label_a11y,
+    ]
+    labels += [f"Component: Component{index}" for index in range(component_count)]
+    labels += [f"Area: Area{index}" for index in range(max(0, label_count - len(labels)))]
+
+    return labels
+
+
+def generate_issues(
+    issue_count=1000,
+    label_count=60,
+    component_count=40,
+    labels_per_issue=4,
+    events_per_issue=6,
+    days=365,
+    seed=0,
+    now=None,
+):
+    """
+    Generate GraphQL-shaped issues, as returned by `fetch_all_issues`, with a
+    configurable scale, label cardinality and timeline length.
+    """
+    rng = random.Random(seed)
+    now = now or datetime.now()
+    labels = label_pool(label_count, component_count)
+    issues = []
+
+    for number in range(1, issue_count + 1):
+        created_at = now - timedelta(seconds=rng.uniform(0, days * 86400))
+        closed_at = None
+
+        if rng.random() < 0.5:
+            closed_at = min(now, created_at + timedelta(days=rng.expovariate(1 / 30)))
+
+        issue_labels = [label_v9] + rng.sample(labels, rng.randint(1, labels_per_issue))
+
+        timeline_items = []
+        event_at = created_at
+
+        # Events stop when the issue closed, or at `now` while it is open
+        for _ in range(rng.randint(0, events_per_issue)):
+            event_at = min(closed_at or now, event_at + timedelta(hours=rng.expovariate(1 / 48)))
+            timeline_items.append({
+                "__typename": rng.choice(["LabeledEvent", "UnlabeledEvent"]),
+                "createdAt": event_at.strftime(TIMESTAMP_FORMAT),
+                "label": {"name": rng.choice(labels)},
+            })
+
+        issues.append({
+            "id": f"I_{number}",
+            "title": f"Synthetic issue {number}",
+            "number": number,
+            "createdAt": created_at.strftime(TIMESTAMP_FORMAT),
+            "updatedAt": (closed_at or event_at).strftime(TIMESTAMP_FORMAT),
+            "closedAt": closed_at.strftime(TIMESTAMP_FORMAT) if closed_at else None,
+            "state": "CLOSED" if closed_at else "OPEN",
+            "labels": {
+                "pageInfo": {"endCursor": None, "hasNextPage": False},
+                "nodes": [{"name": name} for name in issue_labels],
+            },
+            "timelineItems": {
+                "pageInfo": {"endCursor": None, "hasNextPage": False},
+                "nodes": timeline_items,
+            },
+        })
+
+    issues.sort(key=lambda issue: issue["createdAt"], reverse=True)
+
+    return issues
+
+
+def search_pages(issues):
+    """
+    Serve issues as GraphQL search result pages, for benchmarking the fetch
+    loop without the network. Pages honour the query's page size and only
+    carry the fields it selects. Returns a `run_query` replacement.
+    """
+    def run_query(query):
+        created = re.search(r"created:(\S+)\.\.(\S+?) ", query)
+        after = re.search(r'after: "(\d+)"', query)
+        first = int(re.search(r"first: (\d+)", query).group(1))
+        fields = [field for field in issues[0] if re.search(rf"\b{field}\b", query)] if issues else []
+
+        start, end = created.groups()
+        selected = [issue for issue in issues if start <= issue["createdAt"][:10] <= end]
+        offset = int(after.group(1)) if after else 0
+
+        return {
+            "data": {
+                "rateLimit": None,
+                "search": {
+                    "issueCount": len(selected),
+                    "pageInfo": {
+                        "endCursor": str(offset + first),
+                        "hasNextPage": offset + first < len(selected),
+                    },
+                    "edges": [
+                        {"node": {field: issue[field] for field in fields}}
+                        for issue in selected[offset:offset + first]
+                    ],
+                },
+            }
+        }
+
+    return run_query
@@ -0,0 +1,95 @@
+import calendar
+
+import numpy as np
+
+from snapshot import NULL_TIMESTAMP
+
+SECONDS_PER_DAY = 86400
+
+# Day 0 (1970-01-01) was a Thursday, so shifting by 3 days makes week 0 start
+# on Monday 1969-12-29 and every week code an ISO (Monday to Sunday) week
+WEEK_SHIFT_DAYS = 3
+
+
+def month_codes(timestamps):
+    """
+    Months since 1970-01 for int64 epoch seconds; null timestamps map to a
+    large negative code that falls outside every window.
+    """
+    return np.asarray(timestamps, dtype=np.int64).view("datetime64[s]").astype("datetime64[M]").view(np.int64)
+
+
+def week_codes(timestamps):
+    """
+    ISO weeks since the week of 1970-01-01 for int64 epoch seconds.
+    """
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    codes = (timestamps // SECONDS_PER_DAY + WEEK_SHIFT_DAYS) // 7
+
+    return np.where(timestamps == NULL_TIMESTAMP, NULL_TIMESTAMP, codes)
+
+
+PERIOD_CODES = {"month": month_codes, "week": week_codes}
+
+
+def period_labels(codes, unit):
+    """
+    "2024 June" for months, the Monday the week starts on for weeks.
+    """
+    if unit == "month":
+        return [f"{1970 + code // 12} {calendar.month_name[code % 12 + 1]}" for code in codes]
+
+    mondays = (np.asarray(codes) * 7 - WEEK_SHIFT_DAYS).astype("datetime64[D]")
+
+    return [str(monday) for monday in mondays]
+
+
+def to_timestamp(value):
+    """
+    Epoch seconds for a naive UTC datetime.
+    """
+    return int(np.datetime64(value, "s").astype(np.int64))
+
+
+def count_by_period(series, unit, end, periods):
+    """
+    Count every timestamp series ({name: int64 epoch seconds}) per calendar
+    `unit` over the `periods` months or weeks ending with the one containing
+    `end`. All series are counted in a single bincount over one shared axis,
+    so the result is dense, zero-filled and aligned.
+    Returns (period codes, {name: counts}), both newest first.
+    """
+    to_codes = PERIOD_CODES[unit]
+    last = int(to_codes(np.array([end]))[0])
+    first = last - periods + 1
+
+    slots = []
+
+    for index, timestamps in enumerate(series.values()):
+        codes = to_codes(timestamps)
+        codes = codes[(codes >= first) & (codes <= last)]
+        slots.append(index * periods + codes - first)
+
+    counts = np.bincount(
+        np.concatenate(slots) if slots else np.array([], dtype=np.int64),
+        minlength=len(series) * periods,
+    ).reshape(len(series), periods)
+
+    return (
+        np.arange(last, first - 1, -1),
+        {name: counts[index, ::-1] for index, name in enumerate(series)},
+    )
+
+
+def periods_since(timestamps, unit, end):
+    """
+    How many periods reach from the earliest of `timestamps` to `end`.
+    """
+    to_codes = PERIOD_CODES[unit]
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    timestamps = timestamps[timestamps != NULL_TIMESTAMP]
+
+    if not len(timestamps):
+        return 1
+
+    return max(1, int(to_codes(np.array([end]))[0] - to_codes(timestamps).min()) + 1)
@@ -1,16 +1,16 @@
-from numpy import tri
-import pandas as pd
-import matplotlib.pyplot as plt
+import time
 
 from pathlib import Path
-from alive_progress import alive_bar
 
 from collections import Counter
 
+from instrumentation import report
+from artifacts import artifacts_exist, data_digest, write_csv
+from buckets import count_by_period, period_labels, to_timestamp
+from snapshot import NULL_TIMESTAMP
+from windows import WINDOW_SIZES, bucket_code
+
 from issues import (
-    normalize_issues,
-    get_issues,
-    label_v9,
     label_epic,
     label_needs_backlog_grooming,
     label_needs_triage,
@@ -19,33 +19,30 @@ from issues import (
 )
 
 
-def save_dataframe(df, filename_base):
-    """
-    Save the given DataFrame to CSV and Excel files.
-    """
-    df.to_csv(f"spreadsheets/{filename_base}.csv", index=False)
-    df.to_excel(f"spreadsheets/{filename_base}.xlsx", index=False)
-
-
-def prepare_and_save_dataframe(data, columns, filename_base):
+def save_table(table, filename_base):
     """
-    Create a DataFrame from data and columns, then save it.
+    Save the given table ({column: values}) as a CSV file.
     """
-    df = pd.DataFrame(data, columns=columns)
-    save_dataframe(df, filename_base)
-    return df
+    write_csv(table, f"spreadsheets/{filename_base}")
 
 
 def initialize_plot(figsize, title, invert_xaxis=False):
     """
-    Initialize a matplotlib plot with the given size and title.
-    Optionally invert the x-axis.
+    Create a standalone Agg Figure (not tracked by pyplot) with the given size
+    and title. Optionally invert the x-axis.
     """
-    _, ax = plt.subplots(figsize=figsize)
+    # matplotlib is only imported once a chart is drawn, so runs where
+    # every chart is unchanged never load it
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    ax = fig.subplots()
     ax.set_title(title)
     if invert_xaxis:
         ax.invert_xaxis()
-    return ax
+    return fig, ax
 
 
 def annotate_bars(ax, bars):
@@ -79,23 +76,30 @@ def annotate_line(ax, x_data, y_data, offset=(0, 7)):
         )
 
 
-# TODO: use all issues, not just the ones from the past year?
-def plot_labels_pie(issues):
-    labels_counter = Counter()
-    no_go_labels = set([label_v9])
-    open_issues = [issue for issue in issues if issue["state"] == "OPEN"]
+def target_issues(context):
+    """
+    "<labels> issues in <repos>" for the labels and repos the context's
+    issues were collected by, for chart titles.
+    """
+    labels = ", ".join(context.target_labels) or "all"
 
-    for issue in open_issues:
-        if issue["state"] == "closed":
-            continue
+    if not context.target_repos:
+        return f"{labels} issues"
 
-        labels = issue["labels"]
+    return f"{labels} issues in {', '.join(context.target_repos)}"
 
-        for label in labels:
-            if label in no_go_labels:
-                continue
 
-            labels_counter.update([label])
+# TODO: use all issues, not just the ones from the past year?
+def labels_pie_data(context):
+    no_go_labels = set(context.target_labels)
+    open_mask = context.open_mask
+    label_counts = context.open_label_counts
+
+    labels_counter = Counter({
+        label: int(count)
+        for label, count in zip(context.labels.names, label_counts)
+        if count > 0 and label not in no_go_labels
+    })
 
     most_common_nr = 10
 
@@ -104,57 +108,49 @@ def plot_labels_pie(issues):
     ]
     values = [value for (_, value) in labels_counter.most_common(most_common_nr)]
 
-    # Prepare DataFrame with label counts and save
-    data = labels_counter.most_common(most_common_nr)
+    return {
+        "table": {
+            "Label": [label for (label, _) in labels_counter.most_common(most_common_nr)],
+            "Count": values,
+        },
+        "labels": labels,
+        "values": values,
+        "open_issues": int(open_mask.sum()),
+        "most_common_nr": most_common_nr,
+        "target": target_issues(context),
+    }
 
-    prepare_and_save_dataframe(data, ["Label", "Count"], "stats-01")
 
-    _, ax = plt.subplots(figsize=(16, 16))
-    ax.set_title(
-        f"Top {most_common_nr} labels out of {len(open_issues)} open v9 issues in microsoft/fluentui"
+def draw_labels_pie(data):
+    labels, values = data["labels"], data["values"]
+
+    fig, ax = initialize_plot(
+        figsize=(16, 16),
+        title=f"Top {data['most_common_nr']} labels out of {data['open_issues']} open {data['target']}",
     )
 
-    plt.pie(values, labels=labels, autopct="%1.0f%%")
+    ax.pie(values, labels=labels, autopct="%1.0f%%")
 
-    return plt
+    return fig
 
 
-def plot_components_issue_bar(issues):
+def components_issue_bar_data(context):
     component_stats = {}
+    label_ids, counts = context.label_index.family_counts(
+        "Component: ",
+        {
+            "Bugs": context.label_mask(label_bug),
+            "Features": context.label_mask(label_feature),
+        },
+    )
 
-    for issue in issues:
-        is_component = False
-        component_name = ""
-
-        for label in issue["labels"]:
-            if not label.startswith("Component: "):
-                continue
-
-            component_name = label.replace("Component: ", "")
-
-            if component_name not in component_stats:
-                component_stats[component_name] = Counter()
-
-            is_component = True
-
-        if is_component:
-            if label_bug in issue["labels"]:
-                component_stats[component_name].update(["Bugs"])
-
-            if label_feature in issue["labels"]:
-                component_stats[component_name].update(["Features"])
-
-    for component, stats in component_stats.copy().items():
-        if "Bugs" not in stats:
-            stats["Bugs"] = 0
-
-        if "Features" not in stats:
-            stats["Features"] = 0
+    for index, label_id in enumerate(label_ids):
+        stats = Counter(Bugs=int(counts["Bugs"][index]), Features=int(counts["Features"][index]))
 
         if stats["Bugs"] == 0 and stats["Features"] == 0:
-            del component_stats[component]
+            continue
 
-    ax = initialize_plot(figsize=(16, 20), title="v9 Component issues")
+        component_stats[context.labels.names[label_id].replace("Component: ", "")] = stats
 
     categories = list(component_stats.keys())
     bugs = [component_stats[category]["Bugs"] for category in categories]
@@ -172,15 +168,25 @@ def plot_components_issue_bar(issues):
         for i in range(len(categories_sorted))
     ]
 
-    # Prepare DataFrame with component stats and save
-    data = {
-        "Component": categories_sorted,
-        "Bugs": bugs_sorted,
-        "Features": features_sorted,
-        "Total": totals_sorted,
+    return {
+        "table": {
+            "Component": categories_sorted,
+            "Bugs": bugs_sorted,
+            "Features": features_sorted,
+            "Total": totals_sorted,
+        },
+        "categories": categories_with_totals_sorted,
+        "bugs": bugs_sorted,
+        "features": features_sorted,
+        "target": target_issues(context),
     }
-    df_components = pd.DataFrame(data)
-    save_dataframe(df_components, "stats-02")
+
+
+def draw_components_issue_bar(data):
+    categories_with_totals_sorted = data["categories"]
+    bugs_sorted, features_sorted = data["bugs"], data["features"]
+
+    fig, ax = initialize_plot(figsize=(16, 20), title=f"Component issues: {data['target']}")
 
     bars_features = ax.barh(
         categories_with_totals_sorted,
@@ -203,59 +209,67 @@ def plot_components_issue_bar(issues):
     ax.set_xlabel("Count")
     ax.legend()
 
-    return plt
-
-
-def plot_issues_in_the_past_12_months_line(issues):
-    open_issues = [issue for issue in issues if issue["state"] == "OPEN"]
-    closed_issues = [issue for issue in issues if issue["state"] == "CLOSED"]
-
-    data_source = pd.DataFrame(open_issues)
-    data_source_closed = pd.DataFrame(closed_issues)
+    return fig
 
-    data_source["createdAt"] = pd.to_datetime(data_source["createdAt"], yearfirst=True)
 
-    data_source_closed["closedAt"] = pd.to_datetime(
-        data_source_closed["closedAt"], yearfirst=True
-    )
-
-    data = (
-        data_source.groupby(
-            [
-                data_source["createdAt"].dt.year,
-                data_source["createdAt"].dt.month_name(),
-            ],
-            sort=False,
-        )["labels"]
-        .count()
-        .head(12)
-    )
+def series_by_period(context, series, unit="month", periods=12):
+    """
+    Dense, zero-filled counts of each timestamp series for the `periods`
+    months or weeks ending at the context's `as_of`, newest first. `series`
+    maps names to functions returning the timestamps; series named after a
+    `windows.METRICS` metric are read from the context's stored windows when
+    those are current, without computing the timestamps.
+    """
+    windows = context.windows
+
+    if (
+        windows is not None
+        and periods == WINDOW_SIZES[unit]
+        and all(windows.is_current(name, context.as_of) for name in series)
+    ):
+        windowed = {name: windows.series(name, context.as_of) for name in series}
+        buckets = [bucket for bucket, _ in next(iter(windowed.values()))]
+
+        return (
+            period_labels([bucket_code(bucket) for bucket in buckets], unit),
+            {name: [count for _, count in pairs] for name, pairs in windowed.items()},
+        )
 
-    data_closed = (
-        data_source_closed.groupby(
-            [
-                data_source_closed["closedAt"].dt.year,
-                data_source_closed["closedAt"].dt.month_name(),
-            ],
-            sort=False,
-        )["labels"]
-        .count()
-        .head(12)
+    codes, counts = count_by_period(
+        {name: timestamps() for name, timestamps in series.items()},
+        unit,
+        to_timestamp(context.as_of),
+        periods,
     )
 
-    values = list(data.values)
-    labels = [f"{k[0]} {k[1]}" for k in list(data.index)]
+    return period_labels(codes, unit), {name: values.tolist() for name, values in counts.items()}
+
+
+def issues_in_the_past_12_months_data(context):
+    issues = context.issues
+    labels, counts = series_by_period(context, {
+        "opened": lambda: issues.created_at[context.open_mask],
+        "closed": lambda: issues.closed_at[context.closed_mask],
+    })
+
+    return {
+        "table": {
+            "Month": labels,
+            "Opened_Issues": counts["opened"],
+            "Closed_Issues": counts["closed"],
+        },
+        "labels": labels,
+        "values": counts["opened"],
+        "closed_labels": labels,
+        "closed_values": counts["closed"],
+    }
 
-    closed_values = list(data_closed.values)
-    closed_labels = [f"{k[0]} {k[1]}" for k in list(data_closed.index)]
 
-    # Prepare DataFrames for opened and closed issues and save
-    df_opened = pd.DataFrame({"Month": labels, "Opened_Issues": values})
-    df_closed = pd.DataFrame({"Month": closed_labels, "Closed_Issues": closed_values})
-    df_combined = pd.merge(df_opened, df_closed, on="Month", how="outer")
-    save_dataframe(df_combined, "stats-03")
+def draw_issues_in_the_past_12_months_line(data):
+    labels, values = data["labels"], data["values"]
+    closed_labels, closed_values = data["closed_labels"], data["closed_values"]
 
-    ax = initialize_plot(
+    fig, ax = initialize_plot(
         figsize=(26, 9),
         title="Issues states in the past 12 months",
         invert_xaxis=True,
@@ -279,98 +293,58 @@ def plot_issues_in_the_past_12_months_line(issues):
             ha="center",
         )
 
-    plt.plot(labels, values, label="Opened issues", linestyle="-", marker="o")
-    plt.plot(
+    ax.plot(labels, values, label="Opened issues", linestyle="-", marker="o")
+    ax.plot(
         closed_labels, closed_values, label="Closed issues", linestyle="--", marker="o"
     )
 
     annotate_line(ax, labels, values)
     annotate_line(ax, closed_labels, closed_values, offset=(0, -15))
 
-    plt.legend()
-
-    return plt
-
-
-def plot_backlog_grooming_line(issues):
-    backlog_grooming_issues = [
-        issue for issue in issues if label_needs_backlog_grooming in issue["labels"]
-    ]
+    ax.legend()
 
-    groomed_issues = []
-
-    for issue in issues:
-        if any(
-            label_needs_backlog_grooming == item["label"]
-            for item in issue.get("timelineItems", [])
-            if item["type"] == "LabeledEvent"
-        ):
-            backlog_grooming_issues.append(issue)
-
-        if any(
-            label_needs_backlog_grooming == item["label"]
-            for item in issue.get("timelineItems", [])
-            if item["type"] == "UnlabeledEvent"
-        ):
-            groomed_issues.append(issue)
-
-    backlog_grooming_df = pd.DataFrame(backlog_grooming_issues).sort_values(
-        by="createdAt", ascending=False
-    )
+    return fig
 
-    backlog_grooming_df["createdAt"] = pd.to_datetime(
-        backlog_grooming_df["createdAt"], yearfirst=True
-    )
-
-    groomed_df = pd.DataFrame(groomed_issues).sort_values(
-        by="createdAt", ascending=False
-    )
 
-    groomed_df["createdAt"] = pd.to_datetime(groomed_df["createdAt"], yearfirst=True)
-
-    data = (
-        backlog_grooming_df.groupby(
-            [
-                backlog_grooming_df["createdAt"].dt.year,
-                backlog_grooming_df["createdAt"].dt.month_name(),
-            ],
-            sort=False,
-        )["labels"]
-        .count()
-        .head(12)
-    )
+def backlog_grooming_data(context):
+    events = context.events
+    created_at = context.issues.created_at
 
-    data_groomed = (
-        groomed_df.groupby(
-            [
-                groomed_df["createdAt"].dt.year,
-                groomed_df["createdAt"].dt.month_name(),
-            ],
-            sort=False,
-        )["labels"]
-        .count()
-        .head(12)
+    # Issues that carry the label now or ever had it added
+    needed_grooming = context.label_mask(label_needs_backlog_grooming) | (
+        events.first_labeled(label_needs_backlog_grooming) != NULL_TIMESTAMP
     )
+    groomed = events.first_unlabeled(label_needs_backlog_grooming) != NULL_TIMESTAMP
+
+    labels, counts = series_by_period(context, {
+        "added": lambda: created_at[needed_grooming],
+        "groomed": lambda: created_at[groomed],
+    })
+
+    return {
+        "table": {
+            "Month": labels,
+            "Added_for_Grooming": counts["added"],
+            "Groomed": counts["groomed"],
+        },
+        "labels": labels,
+        "values": counts["added"],
+        "groomed_labels": labels,
+        "groomed_values": counts["groomed"],
+    }
 
-    values = list(data.values)
-    labels = [f"{k[0]} {k[1]}" for k in list(data.index)]
-
-    groomed_values = list(data_groomed.values)
-    groomed_labels = [f"{k[0]} {k[1]}" for k in list(data_groomed.index)]
 
-    # Prepare DataFrames for backlog grooming stats and save
-    df_backlog = pd.DataFrame({"Month": labels, "Added_for_Grooming": values})
-    df_groomed = pd.DataFrame({"Month": groomed_labels, "Groomed": groomed_values})
-    df_combined = pd.merge(df_backlog, df_groomed, on="Month", how="outer")
-    save_dataframe(df_combined, "stats-04")
+def draw_backlog_grooming_line(data):
+    labels, values = data["labels"], data["values"]
+    groomed_labels, groomed_values = data["groomed_labels"], data["groomed_values"]
 
-    ax = initialize_plot(
+    fig, ax = initialize_plot(
         figsize=(26, 9),
         title="Issues that required backlog grooming in the past 12 months",
     )
     ax.invert_xaxis()
 
-    plt.plot(
+    ax.plot(
         labels,
         values,
         label="Added for grooming",
@@ -378,7 +352,7 @@ def plot_backlog_grooming_line(issues):
         marker="o",
         linewidth=2,
     )
-    plt.plot(
+    ax.plot(
         groomed_labels,
         groomed_values,
         label="Groomed",
@@ -400,45 +374,29 @@ def plot_backlog_grooming_line(issues):
         offset=(0, 10),
     )
 
-    plt.legend()
-
-    return plt
+    ax.legend()
 
+    return fig
 
-def plot_closed_epics_line(issues):
-    closed_epics = [
-        issue
-        for issue in issues
-        if issue["state"] == "CLOSED" and label_epic in issue["labels"]
-    ]
 
-    closed_epics_df = pd.DataFrame(closed_epics).sort_values(
-        by="closedAt", ascending=False
-    )
-    closed_epics_df["closedAt"] = pd.to_datetime(
-        closed_epics_df["closedAt"], yearfirst=True
-    )
+def closed_epics_data(context):
+    labels, counts = series_by_period(context, {
+        "closed_epics": lambda: context.issues.closed_at[
+            context.closed_mask & context.label_mask(label_epic)
+        ],
+    })
 
-    data = (
-        closed_epics_df.groupby(
-            [
-                closed_epics_df["closedAt"].dt.year,
-                closed_epics_df["closedAt"].dt.month_name(),
-            ],
-            sort=False,
-        )["labels"]
-        .count()
-        .head(12)
-    )
+    return {
+        "table": {"Month": labels, "Closed_Epics": counts["closed_epics"]},
+        "labels": labels,
+        "values": counts["closed_epics"],
+    }
 
-    values = list(data.values)
-    labels = [f"{k[0]} {k[1]}" for k in list(data.index)]
 
-    # Prepare DataFrame for closed epics and save
-    df_closed_epics = pd.DataFrame({"Month": labels, "Closed_Epics": values})
-    save_dataframe(df_closed_epics, "stats-05")
+def draw_closed_epics_line(data):
+    labels, values = data["labels"], data["values"]
 
-    ax = initialize_plot(
+    fig, ax = initialize_plot(
         figsize=(26, 9),
         title="Closed Epics in the past 12 months",
     )
@@ -453,89 +411,55 @@ def plot_closed_epics_line(issues):
             ha="center",
         )
 
-    plt.plot(labels, values, label="Closed Epics", linestyle="-", marker="o")
+    ax.plot(labels, values, label="Closed Epics", linestyle="-", marker="o")
 
     annotate_line(ax, labels, values)
 
-    plt.legend()
-
-    return plt
-
-
-def plot_triage_issues_line(issues):
-    from datetime import datetime, timedelta
-
-    # Collect dates when issues required triage (label added)
-    triage_needed_dates = []
-    for issue in issues:
-        for event in issue.get("timelineItems", []):
-            if event["type"] == "LabeledEvent" and event["label"] == label_needs_triage:
-                triage_needed_dates.append(event["createdAt"])
-                break  # Only consider the first time it was labeled
-
-    # Collect dates when issues were triaged (label removed)
-    triaged_dates = []
-    for issue in issues:
-        for event in issue.get("timelineItems", []):
-            if (
-                event["type"] == "UnlabeledEvent"
-                and event["label"] == label_needs_triage
-            ):
-                triaged_dates.append(event["createdAt"])
-                break  # Only consider the first time it was unlabeled
-
-    # Convert to DataFrames and parse dates
-    df_triage_needed = pd.DataFrame({"date": triage_needed_dates})
-    df_triage_needed["date"] = pd.to_datetime(df_triage_needed["date"], yearfirst=True)
-    df_triage_needed = df_triage_needed.sort_values(by="date")
-
-    df_triaged = pd.DataFrame({"date": triaged_dates})
-    df_triaged["date"] = pd.to_datetime(df_triaged["date"], yearfirst=True)
-    df_triaged = df_triaged.sort_values(by="date")
-
-    # Calculate the cutoff date for 12 weeks ago
-    cutoff_date = datetime.now() - timedelta(weeks=12)
-
-    # Filter the DataFrames to include only the past 12 weeks
-    df_triage_needed = df_triage_needed[df_triage_needed["date"] >= cutoff_date]
-    df_triaged = df_triaged[df_triaged["date"] >= cutoff_date]
-
-    # Group by week starting on Monday
-    data_needed = (
-        df_triage_needed.groupby(pd.Grouper(key="date", freq="W-MON"))["date"]
-        .size()
-        .reset_index(name="count")
-    )
+    ax.legend()
 
-    data_triaged = (
-        df_triaged.groupby(pd.Grouper(key="date", freq="W-MON"))["date"]
-        .size()
-        .reset_index(name="count")
+    return fig
+
+
+def triage_issues_data(context):
+    # When issues first required triage (label added) and were first
+    # triaged (label removed), per ISO week over the past 12 weeks
+    labels, counts = series_by_period(
+        context,
+        {
+            "triage_needed": lambda: context.events.first_labeled(label_needs_triage),
+            "triaged": lambda: context.events.first_unlabeled(label_needs_triage),
+        },
+        unit="week",
     )
 
-    # Prepare data for plotting
-    labels_needed = data_needed["date"].dt.strftime("%Y-%m-%d").tolist()
-    values_needed = data_needed["count"].tolist()
+    # Oldest week first
+    labels = labels[::-1]
+    values_needed = counts["triage_needed"][::-1]
+    values_triaged = counts["triaged"][::-1]
+
+    return {
+        "table": {
+            "Week": labels,
+            "Issues_Needing_Triage": values_needed,
+            "Issues_Triaged": values_triaged,
+        },
+        "labels_needed": labels,
+        "values_needed": values_needed,
+        "labels_triaged": labels,
+        "values_triaged": values_triaged,
+    }
 
-    labels_triaged = data_triaged["date"].dt.strftime("%Y-%m-%d").tolist()
-    values_triaged = data_triaged["count"].tolist()
 
-    # Prepare DataFrames for triage stats and save
-    df_triage_needed = pd.DataFrame(
-        {"Week": labels_needed, "Issues_Needing_Triage": values_needed}
-    )
-    df_triaged = pd.DataFrame(
-        {"Week": labels_triaged, "Issues_Triaged": values_triaged}
-    )
-    df_combined = pd.merge(df_triage_needed, df_triaged, on="Week", how="outer")
-    save_dataframe(df_combined, "stats-06")
+def draw_triage_issues_line(data):
+    labels_needed, values_needed = data["labels_needed"], data["values_needed"]
+    labels_triaged, values_triaged = data["labels_triaged"], data["values_triaged"]
 
-    ax = initialize_plot(
+    fig, ax = initialize_plot(
         figsize=(26, 9),
         title="Issues Needing Triage vs Issues Triaged Per Week",
     )
 
-    plt.plot(
+    ax.plot(
         labels_needed,
         values_needed,
         label="Issues Needing Triage",
@@ -543,7 +467,7 @@ def plot_triage_issues_line(issues):
         marker="o",
         color="orange",
     )
-    plt.plot(
+    ax.plot(
         labels_triaged,
         values_triaged,
         label="Issues Triaged",
@@ -573,57 +497,149 @@ def plot_triage_issues_line(issues):
             ha="center",
         )
 
-    plt.xticks(rotation=45)
-    plt.legend()
-    plt.tight_layout()
+    ax.tick_params(axis="x", labelrotation=45)
+    ax.legend()
 
-    return plt
+    return fig
+
+
+# Optional issue fields (see issues.ISSUE_FIELDS) each chart reads
+CHART_FIELDS = {
+    "stats-01": {"labels"},
+    "stats-02": {"labels"},
+    "stats-03": {"closedAt"},
+    "stats-04": {"labels", "timelineItems"},
+    "stats-05": {"labels", "closedAt"},
+    "stats-06": {"timelineItems"},
+}
+
+# Shared intermediate products (pipeline nodes) each chart reads
+CHART_INPUTS = {
+    "stats-01": ["open_label_counts"],
+    "stats-02": ["label_index"],
+    "stats-03": [],
+    "stats-04": ["events"],
+    "stats-05": [],
+    "stats-06": ["events"],
+}
+
+CHARTS = {
+    "stats-01": (labels_pie_data, draw_labels_pie),
+    "stats-02": (components_issue_bar_data, draw_components_issue_bar),
+    "stats-03": (issues_in_the_past_12_months_data, draw_issues_in_the_past_12_months_line),
+    "stats-04": (backlog_grooming_data, draw_backlog_grooming_line),
+    "stats-05": (closed_epics_data, draw_closed_epics_line),
+    "stats-06": (triage_issues_data, draw_triage_issues_line),
+}
+
+
+def plot_chart(name, context):
+    """
+    Aggregate a chart's data, save its spreadsheets and return its Figure.
+    """
+    data_function, draw_function = CHARTS[name]
+    data = data_function(context)
+    save_table(data["table"], name)
+
+    return draw_function(data)
 
 
-def _generate_and_save_plots(issues):
-    with alive_bar(6, title="Generating and saving charts", unit=" charts") as bar:
-        plt = plot_labels_pie(issues)
-        plt.tight_layout()
-        plt.savefig("images/stats-01.png")
+def plot_labels_pie(context):
+    return plot_chart("stats-01", context)
 
-        bar()
 
-        plt = plot_components_issue_bar(issues)
-        plt.tight_layout()
-        plt.savefig("images/stats-02.png")
+def plot_components_issue_bar(context):
+    return plot_chart("stats-02", context)
 
-        bar()
 
-        plt = plot_issues_in_the_past_12_months_line(issues)
-        plt.tight_layout()
-        plt.savefig("images/stats-03.png")
+def plot_issues_in_the_past_12_months_line(context):
+    return plot_chart("stats-03", context)
 
-        bar()
 
-        plt = plot_backlog_grooming_line(issues)
-        plt.tight_layout()
-        plt.savefig("images/stats-04.png")
+def plot_backlog_grooming_line(context):
+    return plot_chart("stats-04", context)
 
-        bar()
 
-        plt = plot_closed_epics_line(issues)
-        plt.tight_layout()
-        plt.savefig("images/stats-05.png")
+def plot_closed_epics_line(context):
+    return plot_chart("stats-05", context)
 
-        bar()
 
-        plt = plot_triage_issues_line(issues)
-        plt.tight_layout()
-        plt.savefig("images/stats-06.png")
-        bar()
+def plot_triage_issues_line(context):
+    return plot_chart("stats-06", context)
 
 
-def main():
-    issues = get_issues(True)
-    normalized_issues = normalize_issues(issues)
+def draw_chart(name, data, image_path):
+    """
+    Draw a chart to `image_path`. Returns the seconds it took.
+    """
+    started_at = time.perf_counter()
+    _, draw_function = CHARTS[name]
 
-    _generate_and_save_plots(normalized_issues)
+    fig = draw_function(data)
+    fig.tight_layout()
+    Path(image_path).parent.mkdir(parents=True, exist_ok=True)
+    fig.savefig(image_path, metadata={"Software": None})
+    fig.clear()
+
+    return time.perf_counter() - started_at
+
+
+def chart_data(name, context):
+    """
+    Aggregate one chart's data: its table plus its plotting inputs.
+    """
+    data_function, _ = CHARTS[name]
+
+    return data_function(context)
+
+
+def render_chart(name, data, previous_digest=None, prefix="", render_pool=None):
+    """
+    Unless a chart's aggregated data matches `previous_digest` and its outputs
+    already exist, write its CSV and render images/<prefix><name>.png, in
+    `render_pool` when one is given.
+    Returns (digest, rendered, seconds per step).
+    """
+    timings = {}
+    digest = data_digest(data)
+    image_path = f"images/{prefix}{name}.png"
+    outputs = [image_path, f"spreadsheets/{prefix}{name}.csv"]
+
+    if digest == previous_digest and artifacts_exist(outputs):
+        return digest, False, timings
+
+    started_at = time.perf_counter()
+    save_table(data["table"], f"{prefix}{name}")
+    timings["export"] = time.perf_counter() - started_at
+
+    started_at = time.perf_counter()
+
+    if render_pool:
+        timings["render"] = render_pool.submit(draw_chart, name, data, image_path).result()
+        # Waiting for a free worker, and for the pool to start
+        timings["queue"] = time.perf_counter() - started_at - timings["render"]
+    else:
+        timings["render"] = draw_chart(name, data, image_path)
+
+    return digest, True, timings
+
+
+def main(as_of=None, names=None):
+    """
+    Render the named charts (by default all of them, plus the workbook of
+    every table) for the collection, with the rolling windows ending at
+    `as_of` (by default now). Only the datasets those charts need are built.
+    """
+    import pipeline
+
+    outputs = [f"chart:{name}" for name in names or CHARTS]
+    pipeline.build(outputs if names else [*outputs, "workbook"], as_of)
+    report.write()
 
 
 if __name__ == "__main__":
-    main()
+    import sys
+
+    from cli import main as cli_main
+
+    cli_main(["chart", *sys.argv[1:]])
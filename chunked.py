@@ -0,0 +1,257 @@
+"""
+Out-of-core export: stream the issues of an `issues.json` export with an
+incremental JSON parser, normalize them a chunk at a time and fold each
+chunk into mergeable partial results, discarding the raw records. Peak
+memory is bounded by the chunk size instead of the history size.
+"""
+import json
+import os
+import re
+
+from collections import Counter
+from datetime import datetime
+
+import numpy as np
+
+import spreadsheets
+
+from artifacts import write_csv
+from buckets import month_codes, to_timestamp
+from events import EventLog
+from issue_table import IssueTable
+from issues import check_stored_fields, fields_for, load_deltas, partition_path
+from sketches import DurationSketches
+from snapshot import NULL_TIMESTAMP, build_columns
+
+CHUNK_SIZE = 5000
+
+# Characters read from the file per step
+READ_SIZE = 1 << 16
+
+# Whitespace and the commas between array elements
+SEPARATOR = re.compile(r"[\s,]*")
+
+# What a number cut short by the end of a read may continue with
+NUMBER_CHARACTERS = re.compile(r"[0-9.eE+-]*")
+
+
+def iter_json_array(path, read_size=READ_SIZE):
+    """
+    Yield the elements of the JSON array in a file one by one, holding only
+    the element being parsed and the unparsed rest of a read in memory.
+    """
+    decoder = json.JSONDecoder()
+
+    with open(path, "r", encoding="utf-8") as json_file:
+        buffer = json_file.read(read_size).lstrip()
+
+        if not buffer.startswith("["):
+            raise ValueError(f"{path} does not hold a JSON array")
+
+        position = 1
+        end_of_file = False
+
+        while True:
+            position = SEPARATOR.match(buffer, position).end()
+
+            if buffer.startswith("]", position):
+                return
+
+            try:
+                element, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if end_of_file:
+                    raise
+
+                end = None
+
+            # The element continues past the buffer, or is a number that
+            # only number characters follow, which might: read on
+            if not end_of_file and (
+                end is None
+                or (
+                    isinstance(element, (int, float))
+                    and NUMBER_CHARACTERS.match(buffer, end).end() == len(buffer)
+                )
+            ):
+                more = json_file.read(read_size)
+                end_of_file = not more
+                buffer = buffer[position:] + more
+                position = 0
+                continue
+
+            yield element
+            position = end
+
+            if position > read_size:
+                buffer = buffer[position:]
+                position = 0
+
+
+def iter_chunks(elements, chunk_size=CHUNK_SIZE):
+    chunk = []
+
+    for element in elements:
+        chunk.append(element)
+
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+
+    if chunk:
+        yield chunk
+
+
+class IssuePartials:
+    """
+    Everything the spreadsheets are computed from, as counters that add up
+    across chunks: open issues per type, issues opened and closed per month,
+    open issues per component, and the duration sketches. Components keep
+    the order their labels were first seen in, like the label ids of a
+    table normalized in one piece.
+    """
+
+    def __init__(self):
+        self.types = Counter(bugs=0, features=0, epics=0)
+        self.opened = Counter()
+        self.closed = Counter()
+        self.components = {}
+        self.durations = DurationSketches()
+
+    @classmethod
+    def from_table(cls, table):
+        partials = cls()
+        masks = spreadsheets.open_type_masks(table.open_mask, table.label_mask)
+
+        partials.types.update({name: int(mask.sum()) for name, mask in masks.items()})
+
+        for counter, timestamps in [(partials.opened, table.created_at), (partials.closed, table.closed_at)]:
+            codes, counts = np.unique(
+                month_codes(timestamps[timestamps != NULL_TIMESTAMP]), return_counts=True
+            )
+            counter.update(dict(zip(codes.tolist(), counts.tolist())))
+
+        partials.components = spreadsheets.component_counts(
+            table.label_index, table.open_mask, table.label_mask
+        )
+        partials.durations = DurationSketches.from_issues(table, EventLog(table))
+
+        return partials
+
+    def merge(self, other):
+        self.types.update(other.types)
+        self.opened.update(other.opened)
+        self.closed.update(other.closed)
+        self.durations.merge(other.durations)
+
+        for name, counts in other.components.items():
+            previous = self.components.get(name, (0, 0, 0))
+            self.components[name] = tuple(a + b for a, b in zip(previous, counts))
+
+        return self
+
+    def monthly_counts(self, as_of):
+        """
+        Dense opened/closed counts for every month from the oldest issue up
+        to `as_of`, newest first, as `count_by_period` gives them.
+        """
+        last = int(month_codes([to_timestamp(as_of)])[0])
+        first = min(self.opened, default=last)
+        codes = list(range(last, min(first, last) - 1, -1))
+
+        return codes, [self.opened[code] for code in codes], [self.closed[code] for code in codes]
+
+
+def fold_journal(issues, journaled):
+    """
+    The stored issues with the journaled version ({number: issue}) of each
+    in its place, then the journaled issues that were not stored.
+    """
+    journaled = dict(journaled)
+
+    for issue in issues:
+        yield journaled.pop(issue["number"], issue)
+
+    yield from journaled.values()
+
+
+def issue_partials(paths, chunk_size=CHUNK_SIZE, dedupe=False, journals=None):
+    """
+    Fold the issues of the `issues.json` exports at `paths` into partials,
+    `chunk_size` issues at a time. `journals` maps a path to the issues
+    journaled since it was written (see `issues.load_deltas`), which replace
+    their stored versions. With `dedupe`, issues found in more than one
+    export count once; only their ids are kept for that.
+    """
+    partials = IssuePartials()
+    seen = set()
+
+    for path in paths:
+        journaled = {issue["number"]: issue for issue in (journals or {}).get(path, [])}
+
+        for chunk in iter_chunks(fold_journal(iter_json_array(path), journaled), chunk_size):
+            if dedupe:
+                chunk = [issue for issue in chunk if issue["id"] not in seen]
+                seen.update(issue["id"] for issue in chunk)
+
+            if chunk:
+                partials.merge(IssuePartials.from_table(IssueTable(*build_columns(chunk))))
+
+    return partials
+
+
+# name: function(partials, as_of) giving the same table as SPREADSHEETS[name]
+SPREADSHEET_TABLES = {
+    "overall_issue_stats": lambda partials, as_of: spreadsheets.overall_issue_stats_table(
+        partials.types["bugs"], partials.types["features"], partials.types["epics"]
+    ),
+    "monthly_stats": lambda partials, as_of: spreadsheets.monthly_stats_table(
+        *partials.monthly_counts(as_of)
+    ),
+    "component_stats": lambda partials, as_of: spreadsheets.component_stats_table(partials.components),
+    "component_durations": lambda partials, as_of: spreadsheets.component_durations_table(
+        partials.durations, as_of
+    ),
+    "monthly_durations": lambda partials, as_of: spreadsheets.monthly_durations_table(
+        partials.durations, as_of
+    ),
+}
+
+
+def export(collection, as_of, names=None, chunk_size=CHUNK_SIZE):
+    """
+    Write the named spreadsheets (by default all of them) of every context
+    the collection aggregates, from the targets' `issues.json` exports.
+    """
+    as_of = as_of or datetime.now()
+    targets = collection["targets"]
+    paths = {target["name"]: partition_path(target, "issues.json") for target in targets}
+    missing = [name for name, path in paths.items() if not os.path.exists(path)]
+
+    if missing:
+        raise FileNotFoundError(
+            f"No issues.json export for {', '.join(missing)}; run `python cli.py fetch` without --no-json")
+
+    check_stored_fields(targets, fields_for(*[
+        spreadsheets.SPREADSHEET_FIELDS[name] for name in names or SPREADSHEET_TABLES
+    ]))
+
+    # Journaled deltas are folded in without compacting them, which would
+    # load every stored issue
+    journals = {paths[target["name"]]: load_deltas(target) for target in targets}
+    partials = {}
+
+    if "combined" in collection["aggregate"]:
+        partials[""] = issue_partials(list(paths.values()), chunk_size, len(paths) > 1, journals)
+
+    if "per-target" in collection["aggregate"]:
+        for name, path in paths.items():
+            partials[f"{name}/"] = issue_partials([path], chunk_size, journals=journals)
+
+    for prefix, prefix_partials in partials.items():
+        path = os.path.join(spreadsheets.SPREADSHEET_PATH, prefix).rstrip("/")
+
+        for name in names or SPREADSHEET_TABLES:
+            write_csv(SPREADSHEET_TABLES[name](prefix_partials, as_of), f"{path}/{name}")
+
+    return partials
@@ -0,0 +1,253 @@
+"""
+Command line entry point for the issue stats pipeline:
+
+    python cli.py fetch [--incremental] [--only NAME,...] [--replay CASSETTE] [DATE]
+    python cli.py normalize
+    python cli.py chart [--only NAME,...] [DATE]
+    python cli.py export [--only NAME,...] [--chunked [--chunk-size N]] [DATE]
+    python cli.py durations [--target NAME] [--component NAME] [FROM [TO]]
+    python cli.py receive [--host HOST] [--port PORT] [--record FILE]
+    python cli.py replay FILE [--url URL]
+
+DATE (`YYYY-MM` or `YYYY-MM-DD`) is the date the one-year and rolling
+windows end at; a month means its last day, or today for the current month.
+
+Each subcommand imports the libraries it needs when it runs, and the GitHub
+token is only read once a fetch sends a query, so `normalize`, `chart` and
+`export` work offline on the stored issues. `receive` applies `issues`
+webhooks signed with GITHUB_WEBHOOK_SECRET to the store as they arrive.
+"""
+import argparse
+import os
+import sys
+
+from datetime import datetime, timedelta
+
+
+def parse_as_of(value):
+    if value is None:
+        return None
+
+    try:
+        if len(value) == 7:
+            month_start = datetime.strptime(value, "%Y-%m")
+            next_month = (month_start + timedelta(days=32)).replace(day=1)
+
+            return min(datetime.now(), next_month - timedelta(seconds=1))
+
+        return datetime.strptime(value, "%Y-%m-%d").replace(hour=23, minute=59, second=59)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected YYYY-MM or YYYY-MM-DD, got {value!r}") from None
+
+
+def fetch(args):
+    import charts
+    import issues
+    import pipeline
+    import spreadsheets
+    import windows
+
+    from instrumentation import report
+
+    check_names(args.only, [*charts.CHARTS, *spreadsheets.SPREADSHEETS])
+
+    if args.replay:
+        os.environ["GITHUB_REPLAY"] = args.replay
+
+    collected = issues.collect_issues(
+        incremental=args.incremental,
+        json_export=not args.no_json,
+        on_fetched=windows.update_windows,
+        fields=pipeline.output_fields(pipeline.named_outputs(args.only)),
+        as_of=args.date,
+    )
+
+    for name, target_issues in collected.items():
+        print(f"{name}: {len(target_issues)} issues")
+
+    report.write()
+
+
+def normalize(args):
+    import issues
+
+    collection = issues.load_collection()
+
+    for name, snapshot in issues.load_snapshots(collection["targets"]).items():
+        table = issues.normalize_issues(snapshot)
+        print(f"{name}: {len(table)} issues, {len(table.labels)} labels, {len(snapshot.event_issue)} events")
+
+
+def check_names(names, known):
+    unknown = sorted(set(names or []) - set(known))
+
+    if unknown:
+        sys.exit(f"Unknown outputs: {', '.join(unknown)} (expected some of {', '.join(known)})")
+
+
+def chart(args):
+    import charts
+
+    check_names(args.only, charts.CHARTS)
+    charts.main(args.date, args.only)
+
+
+def export(args):
+    import pipeline
+    import spreadsheets
+
+    from instrumentation import report
+
+    check_names(args.only, spreadsheets.SPREADSHEETS)
+
+    if args.chunked:
+        import chunked
+        import issues
+
+        chunked.export(issues.load_collection(), args.date, args.only, args.chunk_size or chunked.CHUNK_SIZE)
+        return
+
+    outputs = [f"spreadsheet:{name}" for name in args.only or spreadsheets.SPREADSHEETS]
+    pipeline.build(outputs if args.only else [*outputs, "workbook"], args.date)
+    report.write()
+
+
+def durations(args):
+    import issues
+    import sketches
+
+    from buckets import SECONDS_PER_DAY
+
+    prefix = f"{args.target}/" if args.target else ""
+
+    try:
+        store = sketches.load_sketches(sketches.sketches_path(issues.load_collection(), prefix))
+    except KeyError:
+        sys.exit(f"Unknown target {args.target!r}")
+
+    for metric in sketches.METRICS:
+        sketch = store.sketch(metric, args.component, args.first, args.last)
+        days = [sketch.quantile(q) for q in sketches.QUANTILES.values()]
+        days = ["-" if value is None else f"{value / SECONDS_PER_DAY:.1f}" for value in days]
+
+        print(f"{metric}: {len(sketch)} issues, {'/'.join(sketches.QUANTILES)} {' / '.join(days)} days")
+
+
+def webhook_secret():
+    import webhooks
+
+    try:
+        return webhooks.get_secret()
+    except KeyError as error:
+        sys.exit(error.args[0])
+
+
+def receive(args):
+    import threading
+
+    import issues
+    import webhooks
+
+    receiver = webhooks.WebhookReceiver(webhook_secret(), issues.load_collection()["targets"], args.record)
+    server, url = webhooks.start(receiver, args.host, args.port)
+    print(f"Receiving webhooks on {url}")
+
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+        print(dict(receiver.stats))
+
+
+def replay(args):
+    import issues
+    import webhooks
+
+    secret = webhook_secret()
+    receiver = None if args.url else webhooks.WebhookReceiver(secret, issues.load_collection()["targets"])
+    statuses = webhooks.replay(webhooks.load_recorded(args.file), secret, args.url, receiver)
+
+    print(", ".join(f"{status}: {count}" for status, count in sorted(statuses.items())))
+
+
+COMMANDS = {
+    "fetch": (fetch, "fetch the issues of every target into data/"),
+    "normalize": (normalize, "load and normalize the stored issues"),
+    "chart": (chart, "render the charts and their spreadsheets"),
+    "export": (export, "write the overall, monthly and component spreadsheets and the workbook"),
+    "durations": (durations, "time-to-triage and time-to-close quantiles from the stored sketches"),
+    "receive": (receive, "apply GitHub issues webhooks to the stored issues as deltas"),
+    "replay": (replay, "send recorded webhook deliveries to a receiver, or apply them directly"),
+}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="cli.py", description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    for name, (_, help_text) in COMMANDS.items():
+        subparser = subparsers.add_parser(name, help=help_text)
+
+        if name not in ["normalize", "durations", "receive", "replay"]:
+            subparser.add_argument("date", nargs="?", type=parse_as_of, help="YYYY-MM or YYYY-MM-DD")
+
+    for name in ["chart", "export"]:
+        subparsers.choices[name].add_argument(
+            "--only",
+            type=lambda value: value.split(","),
+            metavar="NAME,...",
+            help=f"only build these {name} outputs and what they need",
+        )
+
+    subparsers.choices["fetch"].add_argument(
+        "--only",
+        type=lambda value: value.split(","),
+        metavar="NAME,...",
+        help="only fetch the issue fields these charts and spreadsheets need",
+    )
+
+    subparsers.choices["export"].add_argument(
+        "--chunked", action="store_true", help="stream issues.json in chunks, with memory bounded by the chunk size"
+    )
+    subparsers.choices["export"].add_argument(
+        "--chunk-size", type=int, help="issues per chunk with --chunked (default 5000)"
+    )
+
+    subparsers.choices["durations"].add_argument("first", nargs="?", metavar="FROM", help="first month, YYYY-MM")
+    subparsers.choices["durations"].add_argument("last", nargs="?", metavar="TO", help="last month, YYYY-MM")
+    subparsers.choices["durations"].add_argument("--target", help="a target of targets.json instead of all combined")
+    subparsers.choices["durations"].add_argument("--component", default="All", help="a component, without `Component: `")
+
+    subparsers.choices["receive"].add_argument("--host", default="127.0.0.1")
+    subparsers.choices["receive"].add_argument("--port", type=int, default=8080)
+    subparsers.choices["receive"].add_argument("--record", metavar="FILE", help="append every verified delivery to FILE")
+    subparsers.choices["replay"].add_argument("file", metavar="FILE", help="deliveries recorded with receive --record")
+    subparsers.choices["replay"].add_argument("--url", help="a running receiver; by default apply to the store directly")
+
+    subparsers.choices["fetch"].add_argument(
+        "--incremental", action="store_true", help="only fetch issues updated since the last fetch"
+    )
+    subparsers.choices["fetch"].add_argument(
+        "--no-json", action="store_true", help="skip the issues.json export"
+    )
+    subparsers.choices["fetch"].add_argument(
+        "--replay", metavar="CASSETTE", help="answer queries from a recorded cassette, offline"
+    )
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    command, _ = COMMANDS[args.command]
+
+    try:
+        command(args)
+    except FileNotFoundError as error:
+        sys.exit(str(error))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+import numpy as np
+
+from issue_table import EVENT_LABELED, EVENT_UNLABELED
+from snapshot import NULL_TIMESTAMP
+
+
+class EventLog:
+    """
+    Flat, columnar log of every labeled/unlabeled event: issue row, event type,
+    label id and timestamp, sorted by (issue, timestamp). The operators return
+    one value per issue so they line up with the IssueTable rows.
+    """
+
+    def __init__(self, table):
+        self.table = table
+        self.labels = table.labels
+        self.issue_count = len(table)
+
+        order = np.lexsort((table.event_created_at, table.event_issue))
+
+        self.issue = table.event_issue[order]
+        self.type = table.event_type[order]
+        self.label = table.event_label[order]
+        self.created_at = table.event_created_at[order]
+
+    def __len__(self):
+        return len(self.issue)
+
+    def select(self, name, event_type=None):
+        """
+        Indices of the events for a label, optionally of a single type.
+        """
+        mask = self.label == self.labels.get(name)
+
+        if event_type is not None:
+            mask &= self.type == event_type
+
+        return np.flatnonzero(mask)
+
+    def _first(self, selected):
+        timestamps = np.full(self.issue_count, NULL_TIMESTAMP, dtype=np.int64)
+        issues, first = np.unique(self.issue[selected], return_index=True)
+        timestamps[issues] = self.created_at[selected[first]]
+
+        return timestamps
+
+    def first_labeled(self, name):
+        """
+        When each issue first got the label, NULL_TIMESTAMP if it never did.
+        """
+        return self._first(self.select(name, EVENT_LABELED))
+
+    def first_unlabeled(self, name):
+        """
+        When the label was first removed from each issue, NULL_TIMESTAMP if never.
+        """
+        return self._first(self.select(name, EVENT_UNLABELED))
+
+    def _transitions(self, name, until=None):
+        """
+        The label's events with redundant repeats dropped, so they alternate
+        between labeled and unlabeled within each issue.
+        """
+        selected = self.select(name)
+
+        if until is not None:
+            selected = selected[self.created_at[selected] <= until]
+
+        issues = self.issue[selected]
+        types = self.type[selected]
+
+        new_issue = np.ones(len(selected), dtype=bool)
+        new_issue[1:] = issues[1:] != issues[:-1]
+        changed = np.ones(len(selected), dtype=bool)
+        changed[1:] = types[1:] != types[:-1]
+
+        return selected[new_issue | changed]
+
+    def currently_labeled(self, name, at=None):
+        """
+        Whether each issue carried the label at the given epoch second
+        (default: after its last recorded event).
+        """
+        transitions = self._transitions(name, at)
+        labeled = np.zeros(self.issue_count, dtype=bool)
+
+        # The last transition of each issue decides its state
+        issues = self.issue[transitions]
+        last = np.ones(len(transitions), dtype=bool)
+        last[:-1] = issues[:-1] != issues[1:]
+        labeled[issues[last]] = self.type[transitions[last]] == EVENT_LABELED
+
+        return labeled
+
+    def time_under_label(self, name, until):
+        """
+        Total seconds each issue spent with the label up to `until` (epoch
+        seconds). A removal without a prior add counts from the issue's creation.
+        """
+        transitions = self._transitions(name, until)
+        issues = self.issue[transitions]
+        types = self.type[transitions]
+        timestamps = self.created_at[transitions]
+
+        # Labeled events open an interval (-t), unlabeled events close it (+t)
+        signed = np.where(types == EVENT_LABELED, -timestamps, timestamps)
+        seconds = np.bincount(issues, weights=signed, minlength=self.issue_count)
+
+        if len(transitions):
+            first = np.ones(len(transitions), dtype=bool)
+            first[1:] = issues[1:] != issues[:-1]
+            opened_by_creation = issues[first & (types == EVENT_UNLABELED)]
+            seconds[opened_by_creation] -= self.table.created_at[opened_by_creation]
+
+            last = np.ones(len(transitions), dtype=bool)
+            last[:-1] = issues[:-1] != issues[1:]
+            still_open = issues[last & (types == EVENT_LABELED)]
+            seconds[still_open] += until
+
+        return seconds.astype(np.int64)
@@ -0,0 +1,301 @@
+import json
+import random
+import re
+import threading
+import time
+import requests
+
+from datetime import datetime, timezone
+from requests.adapters import HTTPAdapter
+
+GRAPHQL_URL = "https://api.github.com/graphql"
+
+RETRY_STATUSES = {500, 502, 503, 504}
+RATE_LIMIT_STATUSES = {403, 429}
+
+# The adaptive page size of a search, which replays must not depend on
+SEARCH_PAGE_SIZE = re.compile(r'(\bsearch\(\s*query:\s*"(?:[^"\\]|\\.)*"\s*,\s*type:\s*\w+\s*,)\s*first:\s*\d+\s*,?')
+
+
+class GraphQLError(Exception):
+    """
+    A query GitHub answered with errors and no data.
+    """
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__("; ".join(error.get("message", str(error)) for error in errors))
+
+
+class TokenBucket:
+    """
+    Classic token bucket: `rate` tokens are added per second, up to `capacity`.
+    Callers block in `acquire` until a token is available.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def acquire(self, tokens=1):
+        while True:
+            with self.lock:
+                self._refill()
+
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+
+                wait_for = (tokens - self.tokens) / self.rate
+
+            time.sleep(wait_for)
+
+    def set_rate(self, rate, drain=False):
+        with self.lock:
+            self._refill()
+            self.rate = rate
+
+            if drain:
+                self.tokens = 0
+
+
+class GraphQLClient:
+    """
+    GitHub GraphQL client with a persistent keep-alive session, retries with
+    jittered exponential backoff and a token bucket paced by the `rateLimit`
+    data GitHub returns with every query. `on_response(seconds, bytes,
+    rate_limit)` is called for every successful response.
+    """
+
+    def __init__(
+        self,
+        token,
+        url=GRAPHQL_URL,
+        pool_size=8,
+        max_retries=5,
+        backoff=1.0,
+        max_backoff=60.0,
+        requests_per_second=5.0,
+        burst=10,
+        pace_below=500,
+        timeout=60,
+        on_response=None,
+    ):
+        self.url = url
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_rate = requests_per_second
+        self.pace_below = pace_below
+        self.timeout = timeout
+        self.on_response = on_response
+        self.bucket = TokenBucket(requests_per_second, burst)
+        self.rate_limit = None
+        self.retries = 0
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+        self.session = requests.Session()
+        self.session.headers["Authorization"] = f"bearer {token}"
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _backoff_delay(self, attempt, retry_after=None):
+        with self.lock:
+            self.retries += 1
+
+        if retry_after is not None:
+            return retry_after
+
+        delay = min(self.max_backoff, self.backoff * 2**attempt)
+
+        # Full jitter so parallel workers don't retry in lockstep
+        return random.uniform(0, delay)
+
+    def _retry_after(self, response):
+        if "Retry-After" in response.headers:
+            return float(response.headers["Retry-After"])
+
+        if response.headers.get("X-RateLimit-Remaining") == "0":
+            reset_at = float(response.headers.get("X-RateLimit-Reset", time.time()))
+            return max(0.0, reset_at - time.time())
+
+        return None
+
+    def _is_rate_limited(self, response):
+        if response.status_code not in RATE_LIMIT_STATUSES:
+            return False
+
+        return (
+            "Retry-After" in response.headers
+            or response.headers.get("X-RateLimit-Remaining") == "0"
+            or "rate limit" in response.text.lower()
+        )
+
+    def _update_rate_limit(self, rate_limit):
+        """
+        Once the remaining point budget drops below `pace_below`, spread it
+        evenly over the time left until it resets, and stall every worker when
+        the budget is exhausted.
+        """
+        if not rate_limit:
+            return
+
+        with self.lock:
+            self.rate_limit = rate_limit
+
+        reset_at = datetime.strptime(rate_limit["resetAt"], "%Y-%m-%dT%H:%M:%SZ")
+        seconds_left = (reset_at.replace(tzinfo=timezone.utc) - datetime.now(timezone.utc)).total_seconds()
+        seconds_left = max(seconds_left, 1.0)
+        cost = max(rate_limit["cost"], 1)
+
+        if rate_limit["remaining"] < cost:
+            self.bucket.set_rate(1 / seconds_left, drain=True)
+        elif rate_limit["remaining"] >= self.pace_below:
+            self.bucket.set_rate(self.max_rate)
+        else:
+            queries_left = rate_limit["remaining"] / cost
+            self.bucket.set_rate(min(self.max_rate, queries_left / seconds_left))
+
+    def run_query(self, query, variables=None):
+        payload = {"query": query}
+
+        if variables:
+            payload["variables"] = variables
+
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            last_attempt = attempt == self.max_retries
+
+            started_at = time.perf_counter()
+
+            try:
+                response = self.session.post(self.url, json=payload, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if last_attempt:
+                    raise
+
+                time.sleep(self._backoff_delay(attempt))
+                continue
+
+            if not last_attempt and (
+                response.status_code in RETRY_STATUSES or self._is_rate_limited(response)
+            ):
+                time.sleep(self._backoff_delay(attempt, self._retry_after(response)))
+                continue
+
+            response.raise_for_status()
+            result = response.json()
+
+            if not last_attempt and "errors" in result and any(
+                error.get("type") == "RATE_LIMITED" for error in result["errors"]
+            ):
+                time.sleep(self._backoff_delay(attempt))
+                continue
+
+            # Errors next to data (e.g. a deleted issue's null node) are left
+            # to the caller; without data there is nothing to return
+            if result.get("errors") and result.get("data") is None:
+                raise GraphQLError(result["errors"])
+
+            rate_limit = (result.get("data") or {}).get("rateLimit")
+            self._update_rate_limit(rate_limit)
+
+            seconds = time.perf_counter() - started_at
+            self.local.last_response = (seconds, rate_limit)
+
+            if self.on_response:
+                self.on_response(seconds, len(response.content), rate_limit)
+
+            return result
+
+    def last_response(self):
+        """
+        (seconds, rate_limit) of the last response this thread received,
+        timed from the request being sent, so without rate-limit pacing and
+        retry backoff.
+        """
+        return getattr(self.local, "last_response", None)
+
+    def close(self):
+        self.session.close()
+
+
+def query_key(query, variables=None):
+    """
+    Whitespace-insensitive key identifying a query and its variables. A
+    search is keyed by its search string and cursor, without its page size:
+    the replayed pages carry their own cursors, so a replay follows the
+    recorded pages whatever size it asks for.
+    """
+    query = SEARCH_PAGE_SIZE.sub(r"\1", query)
+
+    return json.dumps([" ".join(query.split()), variables or {}], sort_keys=True)
+
+
+class RecordingClient:
+    """
+    Wraps a client and appends every query with its response to a JSON Lines
+    cassette, for `ReplayClient` or the stand-in server to serve later.
+    """
+
+    def __init__(self, client, path):
+        self.client = client
+        self.path = path
+        self.lock = threading.Lock()
+
+    def run_query(self, query, variables=None):
+        result = self.client.run_query(query, variables)
+        record = {"query": query, "variables": variables, "response": result}
+
+        with self.lock, open(self.path, "a") as cassette:
+            cassette.write(json.dumps(record) + "\n")
+
+        return result
+
+    def last_response(self):
+        return self.client.last_response()
+
+    def close(self):
+        self.client.close()
+
+
+def load_cassette(path):
+    with open(path, "r") as cassette:
+        records = [json.loads(line) for line in cassette if line.strip()]
+
+    return {query_key(record["query"], record["variables"]): record["response"] for record in records}
+
+
+class ReplayClient:
+    """
+    Answers queries from a cassette written by `RecordingClient`, without a
+    token or network. A fetch replays from it as long as it asks for the
+    same date range and fields as the recorded one.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.responses = load_cassette(path)
+
+    def run_query(self, query, variables=None):
+        try:
+            return self.responses[query_key(query, variables)]
+        except KeyError:
+            raise KeyError(f"{self.path} has no recorded response for this query") from None
+
+    def last_response(self):
+        # Replayed responses take no time to adapt to
+        return None
+
+    def close(self):
+        pass
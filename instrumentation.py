@@ -0,0 +1,183 @@
+import json
+import os
+import resource
+import sys
+import threading
+import time
+
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+REPORT_PATH = "data/run-report.json"
+
+
+def peak_rss_mb():
+    """
+    Peak resident set size of this process and of its finished children
+    (e.g. chart render workers), in MB.
+    """
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    scale = 2**20 if sys.platform == "darwin" else 2**10
+
+    return {"self": round(own / scale, 1), "children": round(children / scale, 1)}
+
+
+class SamplingProfiler:
+    """
+    Minimal sampling profiler: a background thread snapshots the profiled
+    thread's stack every `interval` seconds and counts the frames it sees.
+    """
+
+    def __init__(self, interval=0.005, thread_id=None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.samples = 0
+        self.own = Counter()
+        self.cumulative = Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+
+            if frame is None:
+                continue
+
+            self.samples += 1
+            self.own[self._location(frame)] += 1
+            seen = set()
+
+            while frame is not None:
+                location = self._location(frame)
+
+                if location not in seen:
+                    self.cumulative[location] += 1
+                    seen.add(location)
+
+                frame = frame.f_back
+
+    def _location(self, frame):
+        code = frame.f_code
+
+        return f"{os.path.basename(code.co_filename)}:{code.co_name}:{code.co_firstlineno}"
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def summary(self, top=25):
+        return {
+            "interval": self.interval,
+            "samples": self.samples,
+            "own": self.own.most_common(top),
+            "cumulative": self.cumulative.most_common(top),
+        }
+
+
+class RunReport:
+    """
+    Structured timings for one pipeline run: per-stage wall/CPU time and peak
+    RSS, per-page fetch metrics, per-chart times and free-form metrics.
+    """
+
+    def __init__(self):
+        self.started_at = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        self.stages = {}
+        self.pages = []
+        self.charts = {}
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name, profile=False):
+        profiler = SamplingProfiler() if profile else None
+        wall_started_at = time.perf_counter()
+        # The CPU time of the thread running the stage: stages run in
+        # parallel, so the process-wide time would count the others too
+        cpu_started_at = time.thread_time()
+
+        if profiler:
+            profiler.start()
+
+        try:
+            yield
+        finally:
+            if profiler:
+                profiler.stop()
+
+            self.stages[name] = {
+                "wall_seconds": round(time.perf_counter() - wall_started_at, 4),
+                "cpu_seconds": round(time.thread_time() - cpu_started_at, 4),
+                "peak_rss_mb": peak_rss_mb(),
+            }
+
+            if profiler:
+                self.stages[name]["profile"] = profiler.summary()
+
+    def record_page(self, seconds, response_bytes, rate_limit=None):
+        with self.lock:
+            self.pages.append({
+                "seconds": round(seconds, 4),
+                "bytes": response_bytes,
+                "cost": rate_limit["cost"] if rate_limit else None,
+                "remaining": rate_limit["remaining"] if rate_limit else None,
+            })
+
+    def record_chart(self, name, timings):
+        self.charts[name] = {key: round(value, 4) for key, value in timings.items()}
+
+    def record(self, name, value):
+        self.metrics[name] = value
+
+    def append(self, name, value):
+        with self.lock:
+            self.metrics.setdefault(name, []).append(value)
+
+    def fetch_summary(self):
+        if not self.pages:
+            return None
+
+        latencies = sorted(page["seconds"] for page in self.pages)
+
+        return {
+            "pages": len(self.pages),
+            "bytes": sum(page["bytes"] for page in self.pages),
+            "cost": sum(page["cost"] or 0 for page in self.pages),
+            "latency_p50": latencies[len(latencies) // 2],
+            "latency_max": latencies[-1],
+        }
+
+    def to_json(self):
+        return {
+            "startedAt": self.started_at,
+            "stages": self.stages,
+            "fetch": {"summary": self.fetch_summary(), "pages": self.pages},
+            "charts": self.charts,
+            "metrics": self.metrics,
+        }
+
+    def write(self, path=REPORT_PATH):
+        with open(path, "w") as json_file:
+            json.dump(self.to_json(), json_file, indent=2)
+
+
+report = RunReport()
+
+
+def profiled_stages():
+    """
+    Stages to run under the sampling profiler, from the comma-separated
+    `PROFILE_STAGES` environment variable.
+    """
+    return set(filter(None, os.environ.get("PROFILE_STAGES", "").split(",")))
+
+
+def stage(name):
+    return report.stage(name, profile=name in profiled_stages())
@@ -0,0 +1,132 @@
+import numpy as np
+
+from label_index import LabelIndex
+from snapshot import STATES, EVENT_TYPES
+
+STATE_OPEN = STATES.index("OPEN")
+STATE_CLOSED = STATES.index("CLOSED")
+EVENT_LABELED = EVENT_TYPES.index("LabeledEvent")
+EVENT_UNLABELED = EVENT_TYPES.index("UnlabeledEvent")
+
+
+def build_label_bits(label_offsets, label_ids, issue_count, label_count):
+    """
+    Pack each issue's label ids into a row of uint64 words, one bit per label.
+    """
+    words = max(1, (label_count + 63) // 64)
+    bits = np.zeros((issue_count, words), dtype=np.uint64)
+
+    rows = np.repeat(np.arange(issue_count), np.diff(label_offsets))
+    label_ids = np.asarray(label_ids, dtype=np.int64)
+    np.bitwise_or.at(
+        bits,
+        (rows, label_ids // 64),
+        np.left_shift(np.uint64(1), (label_ids % 64).astype(np.uint64)),
+    )
+
+    return bits
+
+
+class IssueTable:
+    """
+    Array-backed normalized issues. Labels are interned to integer ids and kept
+    both as the snapshot's CSR columns (the ids of row `i` are
+    `label_ids[label_offsets[i]:label_offsets[i + 1]]`) and as per-issue
+    bitsets, timestamps are int64 epoch seconds and timeline items are flat
+    event columns pointing back at issue rows.
+    """
+
+    __slots__ = (
+        "number",
+        "created_at",
+        "closed_at",
+        "state",
+        "title_offsets",
+        "titles",
+        "label_offsets",
+        "label_ids",
+        "label_bits",
+        "labels",
+        "event_issue",
+        "event_type",
+        "event_label",
+        "event_created_at",
+        "_label_index",
+    )
+
+    def __init__(self, columns, labels):
+        self.number = np.asarray(columns["number"])
+        self.created_at = np.asarray(columns["created_at"])
+        self.closed_at = np.asarray(columns["closed_at"])
+        self.state = np.asarray(columns["state"])
+        self.title_offsets = np.asarray(columns["title_offsets"])
+        self.titles = np.asarray(columns["titles"])
+        self.labels = labels
+        self.label_offsets = np.asarray(columns["label_offsets"])
+        self.label_ids = np.asarray(columns["label_ids"])
+        self.label_bits = build_label_bits(
+            self.label_offsets, self.label_ids, len(self.number), len(labels)
+        )
+        self.event_issue = np.asarray(columns["event_issue"])
+        self.event_type = np.asarray(columns["event_type"])
+        self.event_label = np.asarray(columns["event_label"])
+        self.event_created_at = np.asarray(columns["event_created_at"])
+        self._label_index = None
+
+    def __len__(self):
+        return len(self.number)
+
+    @property
+    def label_index(self):
+        """
+        Inverted label index, built on first use.
+        """
+        if self._label_index is None:
+            self._label_index = LabelIndex(self)
+
+        return self._label_index
+
+    @property
+    def open_mask(self):
+        return self.state == STATE_OPEN
+
+    @property
+    def closed_mask(self):
+        return self.state == STATE_CLOSED
+
+    def title(self, row):
+        start, end = self.title_offsets[row], self.title_offsets[row + 1]
+
+        return bytes(self.titles[start:end]).decode("utf-8")
+
+    def label_mask(self, name):
+        """
+        Boolean mask of the issues currently carrying the given label.
+        """
+        label_id = self.labels.get(name)
+
+        if label_id < 0:
+            return np.zeros(len(self), dtype=bool)
+
+        word = self.label_bits[:, label_id // 64]
+
+        return (word >> np.uint64(label_id % 64)) & np.uint64(1) == 1
+
+    def label_rows(self):
+        """
+        The issue row of each entry of `label_ids`.
+        """
+        return np.repeat(np.arange(len(self)), np.diff(self.label_offsets))
+
+    def label_counts(self, mask=None):
+        """
+        Number of issues carrying each label id, optionally within a mask.
+        """
+        label_ids = self.label_ids if mask is None else self.label_ids[mask[self.label_rows()]]
+
+        return np.bincount(label_ids, minlength=len(self.labels))
+
+    def issue_labels(self, row):
+        label_ids = np.sort(self.label_ids[self.label_offsets[row]:self.label_offsets[row + 1]])
+
+        return [self.labels.names[label_id] for label_id in label_ids]
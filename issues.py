@@ -1,12 +1,23 @@
 import json
 import os
-import requests
+import sys
+import threading
 
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
 from alive_progress import alive_bar
 
-load_dotenv()
+from instrumentation import report, stage
+from issue_table import IssueTable
+from snapshot import (
+    Snapshot,
+    build_columns,
+    export_json,
+    read_snapshot,
+    snapshot_exists,
+    write_snapshot,
+)
 
 label_v9 = "Fluent UI react-components (v9)"
 label_epic = "Type: Epic"
@@ -18,41 +29,101 @@ label_soft_close = "Resolution: Soft Close"
 label_parter_ask = "Partner Ask"
 label_needs_triage = "Needs: Triage :mag:"
 
-token = os.environ["GITHUB_TOKEN"]
 repo = "microsoft/fluentui"
+data_dir = "data"
+targets_path = "targets.json"
+deltas_name = 'deltas.jsonl'
+
+# How far before the last run's start an incremental fetch asks from, for
+# issues indexed late by search; refetching them is harmless
+INCREMENTAL_OVERLAP = timedelta(minutes=10)
+
+# The target collected when there is no targets.json; its partition is data/ itself
+default_target = {'name': 'fluentui-v9', 'repo': repo, 'label': label_v9, 'path': data_dir}
+
+ISSUE_FIELDS = ['id', 'title', 'number', 'createdAt', 'updatedAt', 'closedAt', 'state']
+REQUIRED_FIELDS = {'id', 'number', 'createdAt', 'updatedAt', 'state'}
+ALL_FIELDS = frozenset(ISSUE_FIELDS + ['labels', 'timelineItems'])
+
+# The search API stops returning results past this many matches per query
+search_result_limit = 1000
+fetch_workers = 8
+connections_batch_size = 25
+
+client = None
+
+
+def get_client():
+    """
+    The shared GraphQL client, created on first use. `GITHUB_REPLAY` answers
+    queries from a recorded cassette instead of the network, `GITHUB_RECORD`
+    records the live responses to one and `GITHUB_GRAPHQL_URL` points the
+    client at another endpoint, such as the stand-in server in
+    `benchmarks/standin.py`.
+    """
+    global client
+
+    if client is not None:
+        return client
+
+    # Imported here so that commands working on stored issues never load
+    # requests or read the token
+    from github_client import GRAPHQL_URL, GraphQLClient, RecordingClient, ReplayClient
+
+    load_dotenv()
+
+    if os.environ.get('GITHUB_REPLAY'):
+        client = ReplayClient(os.environ['GITHUB_REPLAY'])
+        return client
+
+    url = os.environ.get('GITHUB_GRAPHQL_URL', GRAPHQL_URL)
+    # Only the real API needs a token
+    token = os.environ['GITHUB_TOKEN'] if url == GRAPHQL_URL else os.environ.get('GITHUB_TOKEN', '')
+
+    client = GraphQLClient(
+        token, url=url, pool_size=fetch_workers, on_response=report.record_page)
+
+    if os.environ.get('GITHUB_RECORD'):
+        client = RecordingClient(client, os.environ['GITHUB_RECORD'])
+
+    return client
 
 
 def run_query(query):
-    url = 'https://api.github.com/graphql'
-    headers = {'Authorization': f'bearer {token}'}
-    response = requests.post(url, json={'query': query}, headers=headers)
-    response.raise_for_status()
+    return get_client().run_query(query)
+
+
+def last_response():
+    """
+    (seconds, rate_limit) of this thread's last response, if a client sent it.
+    """
+    return client.last_response() if client is not None else None
+
 
-    return response.json()
+def generate_search_query(repo, created_interval, updated_interval, label=label_v9):
+    return f'repo:{repo} is:issue created:{created_interval} updated:{updated_interval} label:\\"{label}\\"'
 
 
-def generate_graphql_query(repo, date_interval, after_query):
+def generate_labels_query(after_query=''):
     return f"""
-    {{
-      search(query: "repo:{repo} is:issue created:{date_interval} updated:{date_interval} label:\\"{label_v9}\\"", type: ISSUE, first: 100, {after_query}) {{
-        pageInfo {{
-          endCursor
-          hasNextPage
-        }}
-        edges {{
-          node {{
-            ... on Issue {{
-              title
-              number
-              createdAt
-              closedAt
-              state
-              labels(first: 100) {{
+              labels(first: 100, {after_query}) {{
+                pageInfo {{
+                  endCursor
+                  hasNextPage
+                }}
                 nodes {{
                   name
                 }}
-              }}
-              timelineItems(first: 100, itemTypes: [LABELED_EVENT, UNLABELED_EVENT]) {{
+              }}"""
+
+
+def generate_timeline_items_query(after_query=''):
+    return f"""
+              timelineItems(first: 100, itemTypes: [LABELED_EVENT, UNLABELED_EVENT], {after_query}) {{
+                pageInfo {{
+                  endCursor
+                  hasNextPage
+                }}
                 nodes {{
                   __typename
                   ... on LabeledEvent {{
@@ -68,7 +139,50 @@ def generate_graphql_query(repo, date_interval, after_query):
                     }}
                   }}
                 }}
-              }}
+              }}"""
+
+
+def fields_for(*field_sets):
+    """
+    The issue fields to fetch for a set of outputs: the union of the fields
+    each output declares, on top of the always-fetched `REQUIRED_FIELDS`.
+    """
+    return frozenset(REQUIRED_FIELDS).union(*field_sets)
+
+
+def generate_issue_fields(fields):
+    selection = ''
+
+    for field in ISSUE_FIELDS:
+        if field in REQUIRED_FIELDS or field in fields:
+            selection += f"\n              {field}"
+
+    if 'labels' in fields:
+        selection += generate_labels_query()
+
+    if 'timelineItems' in fields:
+        selection += generate_timeline_items_query()
+
+    return selection
+
+
+def generate_graphql_query(search_query, after_query, fields=ALL_FIELDS, page_size=100):
+    return f"""
+    {{
+      rateLimit {{
+        cost
+        remaining
+        resetAt
+      }}
+      search(query: "{search_query}", type: ISSUE, first: {page_size}, {after_query}) {{
+        issueCount
+        pageInfo {{
+          endCursor
+          hasNextPage
+        }}
+        edges {{
+          node {{
+            ... on Issue {{{generate_issue_fields(fields)}
             }}
           }}
         }}
@@ -77,96 +191,703 @@ def generate_graphql_query(repo, date_interval, after_query):
     """
 
 
-def fetch_all_issues():
-    current_date = datetime.now()
+def generate_connections_query(issues):
+    """
+    Build one aliased query that fetches the next page of every truncated
+    `labels`/`timelineItems` connection of the given issues.
+    """
+    nodes = []
+
+    for index, issue in enumerate(issues):
+        connections = ''
+
+        for connection, generate_query in connection_queries.items():
+            page_info = issue.get(connection, {}).get('pageInfo', {})
+
+            if page_info.get('hasNextPage'):
+                connections += generate_query(f'after: "{page_info["endCursor"]}"')
+
+        nodes.append(f"""
+      issue{index}: node(id: "{issue['id']}") {{
+        ... on Issue {{{connections}
+        }}
+      }}""")
+
+    return f"""
+    {{
+      rateLimit {{
+        cost
+        remaining
+        resetAt
+      }}{''.join(nodes)}
+    }}
+    """
+
+
+connection_queries = {
+    'labels': generate_labels_query,
+    'timelineItems': generate_timeline_items_query,
+}
+
+
+def has_more_connection_pages(issue):
+    return any(
+        issue.get(connection, {}).get('pageInfo', {}).get('hasNextPage')
+        for connection in connection_queries
+    )
+
+
+def fetch_remaining_connections(issues):
+    """
+    Second fetch phase: page through labels and timeline items beyond the first
+    100 for the issues that have more, batching many issues per request.
+    """
+    truncated = [issue for issue in issues if has_more_connection_pages(issue)]
+
+    if not truncated:
+        return issues
+
+    with alive_bar(0, title="Fetching truncated labels and events", unit=" pages") as bar:
+        while truncated:
+            batches = [
+                truncated[index:index + connections_batch_size]
+                for index in range(0, len(truncated), connections_batch_size)
+            ]
+
+            with ThreadPoolExecutor(max_workers=fetch_workers) as executor:
+                results = list(executor.map(
+                    lambda batch: run_query(generate_connections_query(batch)), batches))
+
+            for batch, result in zip(batches, results):
+                for index, issue in enumerate(batch):
+                    node = result['data'][f'issue{index}']
+
+                    # Deleted or transferred since the search: keep what was fetched
+                    if node is None:
+                        for connection in connection_queries:
+                            if connection in issue:
+                                issue[connection]['pageInfo']['hasNextPage'] = False
+
+                        continue
+
+                    for connection in connection_queries:
+                        if connection in node:
+                            issue[connection]['nodes'].extend(node[connection]['nodes'])
+                            issue[connection]['pageInfo'] = node[connection]['pageInfo']
+
+                bar()
+
+            truncated = [issue for issue in truncated if has_more_connection_pages(issue)]
+
+    return issues
+
+
+def get_date_interval(current_date=None):
+    current_date = current_date or datetime.now()
     one_year_ago = current_date - timedelta(days=365)
 
     current_date_fmt = current_date.strftime('%Y-%m')
     one_year_ago_fmt = one_year_ago.strftime('%Y-%m')
 
-    date_interval = f"{one_year_ago_fmt}..{current_date_fmt}"
+    return f"{one_year_ago_fmt}..{current_date_fmt}"
+
+
+def window_start(as_of=None):
+    """
+    The first month ("YYYY-MM") of the one-year window ending at `as_of`;
+    issues created before it are not stored.
+    """
+    return get_date_interval(as_of).split('..')[0]
+
+
+def get_month_shards(date_interval):
+    """
+    Split a `YYYY-MM..YYYY-MM` interval into one (start, end) date pair per month.
+    """
+    first_month, last_month = [
+        datetime.strptime(month, '%Y-%m').date() for month in date_interval.split('..')
+    ]
+
+    shards = []
+    month_start = first_month
+
+    while month_start <= last_month:
+        next_month = (month_start + timedelta(days=32)).replace(day=1)
+        shards.append((month_start, next_month - timedelta(days=1)))
+        month_start = next_month
+
+    return shards
+
+
+def split_shard(shard):
+    start, end = shard
+    middle = start + (end - start) / 2
+
+    return [(start, middle), (middle + timedelta(days=1), end)]
+
+
+class AdaptivePageSize:
+    """
+    Search page size shared by all shard workers. It shrinks when pages time
+    out, or are slow while costing more than one rate-limit point (a smaller
+    page then costs proportionally less), and grows back while they stay well
+    under the target. Pages costing a single point are not shrunk for being
+    slow, since smaller ones would spend more points per issue.
+    """
+
+    def __init__(self, initial=100, minimum=10, maximum=100, target_seconds=5.0):
+        self.size = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_seconds = target_seconds
+        self.lock = threading.Lock()
+
+    def update(self, seconds, cost=None):
+        with self.lock:
+            if seconds > self.target_seconds:
+                if cost is None or cost > 1:
+                    self.size = max(self.minimum, self.size // 2)
+            elif seconds < self.target_seconds / 2:
+                self.size = min(self.maximum, self.size + max(1, self.size // 4))
+
+    def shrink(self):
+        """
+        Halve the page size after a failed page and stop growing back to the
+        size that failed. Returns False when it is already at the minimum.
+        """
+        with self.lock:
+            if self.size == self.minimum:
+                return False
+
+            self.maximum = max(self.minimum, self.size - 1)
+            self.size = max(self.minimum, self.size // 2)
+
+            return True
+
+
+def fetch_page(search_query, after_query, fields, page_size):
+    import requests
+
+    from github_client import RETRY_STATUSES
+
+    while True:
+        size = page_size.size
+
+        try:
+            result = run_query(generate_graphql_query(search_query, after_query, fields, size))
+        except (requests.HTTPError, requests.Timeout) as error:
+            response = getattr(error, 'response', None)
+            timed_out = response is None or response.status_code in RETRY_STATUSES
+
+            # Large pages of nested connections are what make GitHub time out
+            if not (timed_out and page_size.shrink()):
+                raise
+
+            continue
+
+        # The response time alone: waiting for the rate limit or retrying
+        # says nothing about how heavy the page is
+        response = last_response()
+
+        if response:
+            seconds, rate_limit = response
+            page_size.update(seconds, rate_limit['cost'] if rate_limit else None)
+
+        return result
+
+
+def fetch_shard(shard, updated_interval, fields=ALL_FIELDS, page_size=None, target=default_target):
+    """
+    Paginate through every issue created within the shard's dates.
+    Returns (issues, pages, subshards); when the shard holds more issues than
+    the search API will return, no issues are fetched and the shard is split.
+    A one-day shard cannot be split, so it is fetched up to the limit and
+    recorded as `truncated_shards` in the run report.
+    """
+    start, end = shard
+    created_interval = f"{start.isoformat()}..{end.isoformat()}"
+    search_query = generate_search_query(
+        target['repo'], created_interval, updated_interval, target['label'])
+    page_size = page_size or AdaptivePageSize()
 
     issues = []
+    pages = 0
     has_next_page = True
-    end_cursor = None
-
     after_query = ''
 
+    while has_next_page:
+        result = fetch_page(search_query, after_query, fields, page_size)
+        search = result['data']['search']
+        pages += 1
+
+        if pages == 1 and search['issueCount'] > search_result_limit:
+            if start < end:
+                return [], pages, split_shard(shard)
+
+            # A single day cannot be split further: the search stops at the limit
+            print(
+                f"Warning: {target['name']} has {search['issueCount']} issues created on {start.isoformat()}, "
+                f"only the first {search_result_limit} are fetched",
+                file=sys.stderr,
+            )
+            report.append('truncated_shards', {
+                'target': target['name'], 'day': start.isoformat(), 'issueCount': search['issueCount'],
+            })
+
+        issues.extend([edge['node'] for edge in search['edges']])
+
+        page_info = search['pageInfo']
+        has_next_page = page_info['hasNextPage']
+
+        if has_next_page:
+            end_cursor = f'"{page_info["endCursor"]}"'
+            after_query = 'after: ' + end_cursor
+
+    return issues, pages, []
+
+
+def fetch_targets(targets, updated_since=None, fields=ALL_FIELDS, as_of=None):
+    """
+    Fetch the one-year window (ending at `as_of`, by default now) of several
+    targets at once: the shards of every target share one worker pool,
+    connection pool and rate-limit budget. `updated_since` maps target names
+    to the timestamp to only fetch updates since. Returns {target name: issues}.
+    """
+    updated_since = updated_since or {}
+    date_interval = get_date_interval(as_of)
+    updated_intervals = {
+        target['name']: f">={updated_since[target['name']]}"
+        if updated_since.get(target['name']) else date_interval
+        for target in targets
+    }
+    page_size = AdaptivePageSize()
+
+    issues_by_target = {target['name']: {} for target in targets}
+
     with alive_bar(0, title="Fetching issues", unit=" pages") as bar:
-        while has_next_page:
-            query = generate_graphql_query(repo, date_interval, after_query)
-            result = run_query(query)
+        with ThreadPoolExecutor(max_workers=fetch_workers) as executor:
+            pending = {}
 
-            issues.extend([edge['node']
-                          for edge in result['data']['search']['edges']])
+            def submit(target, shard):
+                future = executor.submit(
+                    fetch_shard, shard, updated_intervals[target['name']], fields, page_size, target)
+                pending[future] = target
 
-            page_info = result['data']['search']['pageInfo']
+            for target in targets:
+                for shard in get_month_shards(date_interval):
+                    submit(target, shard)
 
-            has_next_page = page_info['hasNextPage']
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
 
-            if has_next_page:
-                end_cursor = f'"{page_info["endCursor"]}"'
-                after_query = 'after: ' + end_cursor
+                for future in done:
+                    target = pending.pop(future)
+                    issues, pages, subshards = future.result()
 
-            bar()
+                    for issue in issues:
+                        issues_by_target[target['name']][issue['number']] = issue
 
-    return issues
+                    for subshard in subshards:
+                        submit(target, subshard)
 
+                    bar(pages)
 
-def get_issues(from_file=False):
-    issues = []
+    report.record('page_size', page_size.size)
 
-    if from_file:
-        data_folder = "data/issues.json"
+    fetched = {
+        name: sorted(issues.values(), key=lambda issue: issue['createdAt'], reverse=True)
+        for name, issues in issues_by_target.items()
+    }
 
-        with open(data_folder, "r") as json_file:
-            issues = json.load(json_file)
+    # Truncated connections of every target are followed in shared batches
+    fetch_remaining_connections([issue for issues in fetched.values() for issue in issues])
+
+    return fetched
+
+
+def fetch_all_issues(updated_since=None, fields=ALL_FIELDS, target=default_target):
+    """
+    Fetch every issue of one target in the one-year window, or only the ones
+    updated since `updated_since`. `fields` limits the optional issue fields
+    requested (see `ISSUE_FIELDS`); the required ones are always fetched.
+    """
+    return fetch_targets([target], {target['name']: updated_since}, fields)[target['name']]
+
+
+def load_collection(path=targets_path):
+    """
+    The collection config: the repo/label targets to collect and whether to
+    aggregate them `combined`, `per-target` or both. Each target is stored in
+    its own partition, `data/<name>` unless it sets a `path`. Without a
+    config file this is the single fluentui v9 target.
+    """
+    if not os.path.exists(path):
+        return {'targets': [default_target], 'aggregate': ['combined']}
+
+    with open(path, "r") as json_file:
+        collection = json.load(json_file)
+
+    for target in collection['targets']:
+        target.setdefault('path', os.path.join(data_dir, target['name']))
+
+    collection.setdefault('aggregate', ['combined'])
+
+    return collection
+
+
+def partition_path(target, name):
+    return os.path.join(target['path'], name)
+
+
+def load_fetch_state(target=default_target):
+    state_path = partition_path(target, 'state.json')
+
+    if not os.path.exists(state_path):
+        return None
+
+    with open(state_path, "r") as json_file:
+        return json.load(json_file)
+
+
+class MissingFieldsError(FileNotFoundError):
+    """
+    The stored issues were fetched without fields an output needs.
+    """
+
+
+def stored_fields(target=default_target):
+    """
+    The issue fields the target's stored issues were fetched with. Stores
+    from before fetches recorded them were fetched with every field.
+    """
+    state = load_fetch_state(target)
+
+    return frozenset(state['fields']) if state and state.get('fields') else ALL_FIELDS
+
+
+def check_stored_fields(targets, fields):
+    """
+    Refuse to report on stored issues that lack some of `fields`, which
+    would otherwise count as empty.
+    """
+    for target in targets:
+        missing = set(fields) - stored_fields(target)
+
+        if missing:
+            raise MissingFieldsError(
+                f"The stored issues of {target['name']} were fetched without {', '.join(sorted(missing))}; "
+                f"run `python cli.py fetch` for these outputs first")
+
+
+def updated_since(state):
+    """
+    The `updated:>=` bound of an incremental fetch: the start of the last
+    run, less `INCREMENTAL_OVERLAP`. The highest `updatedAt` fetched would
+    miss issues that changed during that run after their shard was fetched.
+    """
+    fetched_at = datetime.strptime(state['fetchedAt'], '%Y-%m-%dT%H:%M:%SZ')
+
+    return (fetched_at - INCREMENTAL_OVERLAP).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def save_fetch_state(issues, fetched_at, previous_state=None, target=default_target, fields=ALL_FIELDS):
+    updated_at = max(
+        (issue['updatedAt'] for issue in issues if issue.get('updatedAt')),
+        default=None,
+    )
+
+    if previous_state and (updated_at is None or previous_state['updatedAt'] > updated_at):
+        updated_at = previous_state['updatedAt']
+
+    state = {
+        'updatedAt': updated_at,
+        'fetchedAt': fetched_at,
+        'fields': sorted(fields),
+    }
+
+    with open(partition_path(target, 'state.json'), "w") as json_file:
+        json.dump(state, json_file, indent=2)
+
+    return state
+
+
+def upsert_issues(stored_issues, fetched_issues, as_of=None):
+    """
+    Merge freshly fetched issues into the stored ones, keyed by issue number.
+    Issues created before the current one-year window are dropped so the
+    store matches what a full fetch would return.
+    """
+    issues_by_number = {issue['number']: issue for issue in stored_issues}
+
+    for issue in fetched_issues:
+        issues_by_number[issue['number']] = issue
+
+    first_month = window_start(as_of)
+
+    issues = [
+        issue for issue in issues_by_number.values()
+        if issue['createdAt'][:7] >= first_month
+    ]
+
+    return sorted(issues, key=lambda issue: issue['createdAt'], reverse=True)
+
+
+def delta_paths(target=default_target):
+    """
+    The journal of issue deltas received since the snapshot was written,
+    after the one being compacted into the snapshot, if any.
+    """
+    journal_path = partition_path(target, deltas_name)
+
+    return [f"{journal_path}.compacting", journal_path]
+
+
+def append_delta(issue, target=default_target):
+    """
+    Record the new state of one issue without rewriting the snapshot.
+    """
+    with open(delta_paths(target)[-1], "a") as journal_file:
+        journal_file.write(json.dumps(issue) + '\n')
+
+
+def load_deltas(target=default_target):
+    deltas = []
+
+    for path in delta_paths(target):
+        if os.path.exists(path):
+            with open(path, "r") as journal_file:
+                deltas.extend(json.loads(line) for line in journal_file if line.strip())
+
+    return deltas
+
+
+def clear_deltas(target=default_target):
+    for path in delta_paths(target):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def compact_deltas(target=default_target):
+    """
+    Fold the journaled deltas into the snapshot (and the issues.json export
+    when there is one) and clear the journal. The journal is moved aside
+    first, so deltas appended meanwhile wait for the next compaction.
+    """
+    compacting_path, journal_path = delta_paths(target)
+
+    if os.path.exists(journal_path) and not os.path.exists(compacting_path):
+        os.replace(journal_path, compacting_path)
+
+    if not os.path.exists(compacting_path):
+        return False
+
+    issues = load_stored_issues(target)
+    write_snapshot(issues, partition_path(target, 'snapshot'))
+
+    if os.path.exists(partition_path(target, 'issues.json')):
+        export_json(issues, partition_path(target, 'issues.json'))
+
+    os.remove(compacting_path)
+
+    return True
+
+
+def load_stored_issues(target=default_target):
+    """
+    The stored issues of a target with the journaled deltas applied.
+    """
+    if snapshot_exists(partition_path(target, 'snapshot')):
+        issues = read_snapshot(partition_path(target, 'snapshot')).to_issues()
     else:
-        issues = fetch_all_issues()
-        data_folder = "data/issues.json"
+        with open(partition_path(target, 'issues.json'), "r") as json_file:
+            issues = json.load(json_file)
 
-        with open(data_folder, "w") as json_file:
-            json.dump(issues, json_file, indent=2)
+    deltas = load_deltas(target)
 
-    return issues
+    return upsert_issues(issues, deltas) if deltas else issues
+
+
+def has_stored_issues(target=default_target):
+    return (
+        snapshot_exists(partition_path(target, 'snapshot'))
+        or os.path.exists(partition_path(target, 'issues.json'))
+    )
+
+
+def collect_issues(
+    targets=None,
+    incremental=False,
+    json_export=True,
+    on_fetched=None,
+    fields=ALL_FIELDS,
+    as_of=None,
+):
+    """
+    Fetch every target (by default those of `targets.json`) concurrently and
+    store each in its partition: a columnar `snapshot`, an `issues.json`
+    export unless `json_export` is False, and the fetch state used by
+    `incremental` runs, which only ask for issues updated since the last one
+started.
+    `on_fetched(fetched_issues, issues, incremental, target, as_of)` is
+    called per target, with `incremental` telling whether only changed issues
+    were fetched. Returns {target name: issues}.
+
+    The fields each target was fetched with are kept in its fetch state. An
+    incremental fetch requests the stored fields too, so updated issues stay
+    as complete as the others, and a target stored without some of `fields`
+    is fetched in full with both instead.
+    """
+    targets = targets or load_collection()['targets']
+    fetched_at = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+    states = {}
+    incremental_targets = set()
+    target_fields = {}
+
+    for target in targets:
+        states[target['name']] = load_fetch_state(target) if incremental else None
+        state = states[target['name']]
+        target_fields[target['name']] = frozenset(fields)
+
+        if state and state.get('fetchedAt') and has_stored_issues(target):
+            if set(fields) <= stored_fields(target):
+                incremental_targets.add(target['name'])
+                target_fields[target['name']] = stored_fields(target)
+            else:
+                print(f"{target['name']} was stored without some of the requested fields, fetching it in full")
+                target_fields[target['name']] = stored_fields(target) | set(fields)
+
+    fields = frozenset(fields).union(*target_fields.values())
+
+    with stage("fetch"):
+        fetched = fetch_targets(
+            targets,
+            {name: updated_since(states[name]) for name in incremental_targets},
+            fields,
+            as_of,
+        )
+
+    report.record("fetched_issues", sum(len(issues) for issues in fetched.values()))
+
+    collected = {}
+
+    with stage("write_snapshot"):
+        for target in targets:
+            name = target['name']
+            issues = fetched[name]
+
+            if name in incremental_targets:
+                issues = upsert_issues(load_stored_issues(target), fetched[name], as_of)
+
+            os.makedirs(target['path'], exist_ok=True)
+            write_snapshot(issues, partition_path(target, 'snapshot'))
+            # The snapshot now holds (or, after a full fetch, supersedes) the deltas
+            clear_deltas(target)
+
+            if json_export:
+                export_json(issues, partition_path(target, 'issues.json'))
+
+            save_fetch_state(fetched[name], fetched_at, states[name], target, target_fields[name])
+            collected[name] = issues
+
+    if on_fetched:
+        for target in targets:
+            name = target['name']
+            on_fetched(fetched[name], collected[name], name in incremental_targets, target, as_of)
+
+    return collected
+
+
+def get_issues(
+    from_file=False,
+    incremental=False,
+    json_export=True,
+    on_fetched=None,
+    fields=ALL_FIELDS,
+    target=default_target,
+):
+    """
+    Return the GraphQL-shaped issues of one target, either from its stored
+    snapshot or by fetching them with `collect_issues`.
+    """
+    if from_file:
+        return load_stored_issues(target)
+
+    return collect_issues([target], incremental, json_export, on_fetched, fields)[target['name']]
+
+
+def get_snapshot(from_file=False, incremental=False, on_fetched=None, fields=ALL_FIELDS, target=default_target):
+    """
+    Like `get_issues`, but return the memory-mapped columnar snapshot.
+    """
+    snapshot_path = partition_path(target, 'snapshot')
+
+    if not (from_file and snapshot_exists(snapshot_path)):
+        issues = get_issues(from_file, incremental, on_fetched=on_fetched, fields=fields, target=target)
+
+        if from_file:
+            write_snapshot(issues, snapshot_path)
+
+    return read_snapshot(snapshot_path)
+
+
+def load_snapshots(targets, fields=()):
+    """
+    The stored snapshots of the targets, {target name: snapshot}, without
+    fetching anything. Journaled deltas are compacted into them first.
+    Raises `MissingFieldsError` when a target was fetched without `fields`.
+    """
+    missing = [target['name'] for target in targets if not has_stored_issues(target)]
+
+    if missing:
+        raise FileNotFoundError(
+            f"No stored issues for {', '.join(missing)}; run `python cli.py fetch` first")
+
+    check_stored_fields(targets, fields)
+
+    for target in targets:
+        compact_deltas(target)
+
+    return {
+        target['name']: get_snapshot(True, target=target)
+        for target in targets
+    }
 
 
 def normalize_issues(issues):
-    normalized_issues = []
+    """
+    Build the compact `IssueTable` from a snapshot or from GraphQL-shaped issues.
+    """
+    if isinstance(issues, Snapshot):
+        return IssueTable(issues.columns, issues.labels)
 
-    for issue in issues:
-        labels = set([label['name'] for label in issue['labels']['nodes']])
-        timeline_items = []
+    columns, labels = build_columns(issues)
 
-        if 'timelineItems' in issue:
-            for timeline_item in issue['timelineItems']['nodes']:
-                formatted_item = {
-                    "type": timeline_item["__typename"],
-                    "createdAt": datetime.strptime(timeline_item["createdAt"], "%Y-%m-%dT%H:%M:%SZ")
-                }
+    return IssueTable(columns, labels)
 
-                if 'label' in timeline_item:
-                    formatted_item["label"] = timeline_item["label"]["name"]
 
-                timeline_items.append(formatted_item)
+def normalize_combined(snapshots):
+    """
+    One `IssueTable` over several targets' snapshots. Issues selected by more
+    than one target are only counted once.
+    """
+    if len(snapshots) == 1:
+        return normalize_issues(snapshots[0])
 
-        normalized_issue = {
-            'title': issue['title'],
-            'number': issue['number'],
-            'createdAt': issue['createdAt'],
-            'closedAt': issue['closedAt'],
-            'state': issue['state'],
-            'labels': labels,
-            'timelineItems': timeline_items
-        }
+    issues_by_id = {}
 
-        normalized_issues.append(normalized_issue)
+    for snapshot in snapshots:
+        for issue in snapshot.to_issues():
+            issues_by_id.setdefault(issue['id'], issue)
 
-    return normalized_issues
+    issues = sorted(issues_by_id.values(), key=lambda issue: issue['createdAt'], reverse=True)
+
+    return normalize_issues(issues)
 
 
 if __name__ == "__main__":
-    issues = get_issues(True)
+    issues = get_snapshot(True)
     normalized_issues = normalize_issues(issues)
 
-    print(normalized_issues[-1])
+    last_row = len(normalized_issues) - 1
+
+    print(normalized_issues.title(last_row), normalized_issues.issue_labels(last_row))
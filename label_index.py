@@ -0,0 +1,75 @@
+import numpy as np
+
+
+class LabelIndex:
+    """
+    Inverted index from label id to the sorted rows of the issues carrying it,
+    stored CSR-style: the rows of label `i` are `rows[offsets[i]:offsets[i + 1]]`.
+    """
+
+    def __init__(self, table):
+        self.table = table
+        self.labels = table.labels
+
+        # The snapshot's label ids are grouped by issue; a stable sort by label
+        # id turns them into postings grouped by label, rows kept ascending
+        label_ids = table.label_ids
+        order = np.argsort(label_ids, kind="stable")
+
+        self.rows = table.label_rows()[order]
+        self.offsets = np.zeros(len(self.labels) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(label_ids, minlength=len(self.labels)), out=self.offsets[1:])
+
+    def label_rows(self, name):
+        label_id = self.labels.get(name)
+
+        if label_id < 0:
+            return np.empty(0, dtype=self.rows.dtype)
+
+        return self.rows[self.offsets[label_id]:self.offsets[label_id + 1]]
+
+    def mask(self, name):
+        mask = np.zeros(len(self.table), dtype=bool)
+        mask[self.label_rows(name)] = True
+
+        return mask
+
+    def family(self, prefix):
+        """
+        Label ids whose names start with the prefix (e.g. `Component:`, `Type:`,
+        `Needs:`), in label id order.
+        """
+        return np.array(
+            [label_id for label_id, name in enumerate(self.labels.names) if name.startswith(prefix)],
+            dtype=np.int64,
+        )
+
+    def family_pairs(self, prefix):
+        """
+        Every (issue row, family member) pair for a label family, as two aligned
+        arrays, plus the label ids of the family members.
+        """
+        label_ids = self.family(prefix)
+        starts = self.offsets[label_ids]
+        sizes = self.offsets[label_ids + 1] - starts
+
+        members = np.repeat(np.arange(len(label_ids)), sizes)
+        positions = np.repeat(starts - np.cumsum(sizes) + sizes, sizes) + np.arange(sizes.sum())
+
+        return self.rows[positions], members, label_ids
+
+    def family_counts(self, prefix, masks):
+        """
+        Count, for each member of a label family, the issues matching each of
+        the given row masks, in one pass over the family's postings.
+
+        Returns the family's label ids and a dict of count arrays keyed like `masks`.
+        """
+        rows, members, label_ids = self.family_pairs(prefix)
+
+        counts = {
+            key: np.bincount(members, weights=mask[rows], minlength=len(label_ids)).astype(int)
+            for key, mask in masks.items()
+        }
+
+        return label_ids, counts
@@ -0,0 +1,282 @@
+"""
+The chart and spreadsheet pipeline as a dependency graph. Every dataset,
+shared intermediate product, table, chart, spreadsheet and the workbook is a
+node; building some outputs runs only the nodes they depend on, each once,
+with independent nodes running in parallel.
+"""
+import multiprocessing
+import os
+
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from alive_progress import alive_bar
+
+import charts
+import spreadsheets
+
+from analysis import analysis_contexts
+from artifacts import load_manifest, save_manifest
+from instrumentation import report, stage
+from issues import fields_for, load_collection, load_snapshots
+from sketches import save_sketches, sketches_path
+
+
+def context_products(attribute):
+    """
+    Node computing one cached `AnalysisContext` product for every context, so
+    the nodes depending on it share it instead of racing to build it.
+    """
+    def compute(contexts):
+        return {prefix: getattr(context, attribute) for prefix, context in contexts.items()}
+
+    return compute
+
+
+def spreadsheet_path(prefix):
+    return os.path.join(spreadsheets.SPREADSHEET_PATH, prefix).rstrip("/")
+
+
+def table_node(name):
+    def build(contexts, *_):
+        return {prefix: charts.chart_data(name, context) for prefix, context in contexts.items()}
+
+    return build
+
+
+def duration_sketches_node(contexts, collection, *_):
+    """
+    Sketch every context's durations and merge them into the stored ones,
+    replacing the months from the stored snapshot's month on, so month ranges
+    can later be queried from the stored buckets alone.
+    """
+    stores = context_products("duration_sketches")(contexts)
+
+    for prefix, store in stores.items():
+        path = sketches_path(collection, prefix)
+
+        if not len(contexts[prefix].issues) and os.path.exists(path):
+            continue
+
+        save_sketches(store, path, contexts[prefix].as_of.strftime("%Y-%m"))
+
+    return stores
+
+
+def chart_node(name):
+    def build(tables, manifest, render_pool):
+        return {
+            f"{prefix}{name}": charts.render_chart(
+                name, data, manifest.get(f"{prefix}{name}"), prefix, render_pool)
+            for prefix, data in tables.items()
+        }
+
+    return build
+
+
+def spreadsheet_node(name):
+    def build(contexts, *_):
+        return {
+            prefix: spreadsheets.SPREADSHEETS[name](context, spreadsheet_path(prefix))
+            for prefix, context in contexts.items()
+        }
+
+    return build
+
+
+def workbook_node(*tables):
+    """
+    One workbook per context with a sheet for every chart and spreadsheet
+    table, in `WORKBOOK_SHEETS` order.
+    """
+    for prefix in tables[0]:
+        sheets = {}
+
+        for sheet, values in zip(WORKBOOK_SHEETS, tables):
+            data = values[prefix]
+            sheets[sheet] = data["table"] if sheet in charts.CHARTS else data
+
+        spreadsheets.export_workbook(sheets, spreadsheet_path(prefix))
+
+
+# Values given when the pipeline is run rather than computed by a node
+PARAMETERS = ["as_of", "fields", "manifest", "render_pool"]
+
+# name: (function, dependencies)
+NODES = {
+    "collection": (load_collection, []),
+    "snapshots": (
+        lambda collection, fields: load_snapshots(collection["targets"], fields),
+        ["collection", "fields"],
+    ),
+    "contexts": (analysis_contexts, ["collection", "snapshots", "as_of"]),
+    "events": (context_products("events"), ["contexts"]),
+    "label_index": (context_products("label_index"), ["contexts"]),
+    "open_label_counts": (context_products("open_label_counts"), ["contexts"]),
+    "duration_sketches": (duration_sketches_node, ["contexts", "collection", "events", "label_index"]),
+}
+
+for chart_name in charts.CHARTS:
+    NODES[f"table:{chart_name}"] = (
+        table_node(chart_name),
+        ["contexts", *charts.CHART_INPUTS[chart_name]],
+    )
+    NODES[f"chart:{chart_name}"] = (
+        chart_node(chart_name),
+        [f"table:{chart_name}", "manifest", "render_pool"],
+    )
+
+for spreadsheet_name in spreadsheets.SPREADSHEETS:
+    NODES[f"spreadsheet:{spreadsheet_name}"] = (
+        spreadsheet_node(spreadsheet_name),
+        ["contexts", *spreadsheets.SPREADSHEET_INPUTS[spreadsheet_name]],
+    )
+
+WORKBOOK_SHEETS = [*charts.CHARTS, *spreadsheets.SPREADSHEETS]
+
+NODES["workbook"] = (
+    workbook_node,
+    [f"table:{name}" if name in charts.CHARTS else f"spreadsheet:{name}" for name in WORKBOOK_SHEETS],
+)
+
+
+def required_nodes(nodes, outputs, given=()):
+    """
+    The nodes needed for the outputs that are not `given`, dependencies first.
+    """
+    order = []
+    seen = set(given)
+
+    def visit(name, path):
+        if name in seen:
+            return
+
+        if name in path:
+            raise ValueError(f"Pipeline dependency cycle through {name!r}")
+
+        if name not in nodes:
+            raise KeyError(f"Unknown pipeline node {name!r}")
+
+        for dependency in nodes[name][1]:
+            visit(dependency, path | {name})
+
+        seen.add(name)
+        order.append(name)
+
+    for output in outputs:
+        visit(output, frozenset())
+
+    return order
+
+
+def run_node(name, function, arguments):
+    with stage(name):
+        return function(*arguments)
+
+
+def run(nodes, outputs, values=None, max_workers=None):
+    """
+    Run the nodes the outputs need, each as soon as its dependencies are done,
+    with independent nodes in parallel threads. `values` gives parameters and
+    already computed nodes, which are not run again. Returns every value.
+    """
+    values = dict(values or {})
+    pending = required_nodes(nodes, outputs, values)
+    running = {}
+
+    with alive_bar(len(pending), title="Building", unit=" nodes") as bar:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            while pending or running:
+                ready = [
+                    name for name in pending
+                    if all(dependency in values for dependency in nodes[name][1])
+                ]
+
+                for name in ready:
+                    function, dependencies = nodes[name]
+                    arguments = [values[dependency] for dependency in dependencies]
+                    running[executor.submit(run_node, name, function, arguments)] = name
+                    pending.remove(name)
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    name = running.pop(future)
+                    values[name] = future.result()
+                    bar()
+
+    return values
+
+
+def named_outputs(names=None):
+    """
+    The `chart:`/`spreadsheet:` outputs of chart and spreadsheet names, or
+    every output including the workbook.
+    """
+    if not names:
+        return [
+            *[f"chart:{name}" for name in charts.CHARTS],
+            *[f"spreadsheet:{name}" for name in spreadsheets.SPREADSHEETS],
+            "workbook",
+        ]
+
+    return [f"chart:{name}" if name in charts.CHARTS else f"spreadsheet:{name}" for name in names]
+
+
+def output_fields(outputs):
+    """
+    The issue fields to fetch, or to have stored, for the outputs.
+    """
+    declared = {
+        **{f"table:{name}": fields for name, fields in charts.CHART_FIELDS.items()},
+        **{f"spreadsheet:{name}": fields for name, fields in spreadsheets.SPREADSHEET_FIELDS.items()},
+    }
+    needed = required_nodes(NODES, outputs, PARAMETERS)
+
+    return fields_for(*[declared[name] for name in needed if name in declared])
+
+
+def build(outputs=None, as_of=None, max_workers=None):
+    """
+    Build the given `chart:<name>`/`spreadsheet:<name>`/`workbook` outputs
+    (by default every chart) with the rolling windows ending at `as_of`. Charts whose data
+    is unchanged are skipped; the others are drawn in a process pool.
+    """
+    outputs = outputs or [f"chart:{name}" for name in charts.CHARTS]
+    manifest = load_manifest()
+
+    # Render workers are forked from a single-threaded server process, since
+    # forking the threaded scheduler itself could deadlock. The server imports
+    # matplotlib once, when the first chart needs drawing.
+    context = multiprocessing.get_context("forkserver")
+    context.set_forkserver_preload(["charts", "matplotlib.figure", "matplotlib.backends.backend_agg"])
+    render_pool = ProcessPoolExecutor(mp_context=context)
+
+    with render_pool:
+        values = run(
+            NODES,
+            outputs,
+            {
+                "as_of": as_of,
+                "fields": output_fields(outputs),
+                "manifest": manifest,
+                "render_pool": render_pool,
+            },
+            max_workers,
+        )
+
+    issues = sum(len(context) for context in values["contexts"].values())
+    normalize_seconds = report.stages["contexts"]["wall_seconds"]
+    report.record("issues", issues)
+    report.record("normalize_issues_per_second", round(issues / max(normalize_seconds, 1e-9)))
+
+    for output in outputs:
+        if not output.startswith("chart:"):
+            continue
+
+        for name, (digest, rendered, timings) in values[output].items():
+            manifest[name] = digest
+            report.record_chart(name, timings)
+            print(f"{name}: {sum(timings.values()):.2f}s{'' if rendered else ' (unchanged, skipped)'}")
+
+    save_manifest(manifest)
+
+    return values
@@ -0,0 +1,300 @@
+"""
+Mergeable quantile sketches of how long issues wait for triage and for
+closing, stored per (metric, component, month) bucket. Any month range and
+component is answered by merging the stored buckets, without the issues.
+"""
+import json
+import math
+import os
+
+from collections import Counter
+
+import numpy as np
+
+from buckets import month_codes
+from issues import data_dir, label_needs_triage, partition_path
+from snapshot import NULL_TIMESTAMP
+
+SKETCHES_NAME = "duration_sketches.json"
+
+# Every quantile is within 1% of a true duration. Sketches only merge when
+# they share it, so it is fixed rather than configurable.
+RELATIVE_ACCURACY = 0.01
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+LOG_GAMMA = math.log(GAMMA)
+
+# Bucket key for the issues of every component, counted once each
+ALL_COMPONENTS = "All"
+
+COMPONENT_PREFIX = "Component: "
+
+METRICS = ["triage", "close"]
+
+QUANTILES = {"p50": 0.5, "p90": 0.9, "p99": 0.99}
+
+
+def bucket_indices(values):
+    """
+    Logarithmic bucket of each positive duration: bucket `i` holds the
+    values in (GAMMA ** (i - 1), GAMMA ** i].
+    """
+    return np.ceil(np.log(np.asarray(values, dtype=np.float64)) / LOG_GAMMA).astype(np.int64)
+
+
+class QuantileSketch:
+    """
+    DDSketch-style quantile sketch: a count per logarithmic bucket, plus the
+    zero durations. Merging adds the counts, so it is exact and order
+    independent, and the size grows with the range of the durations, not
+    their number.
+    """
+
+    def __init__(self, counts=None, zero_count=0):
+        self.counts = Counter({int(index): count for index, count in (counts or {}).items()})
+        self.zero_count = zero_count
+
+    def __len__(self):
+        return self.zero_count + sum(self.counts.values())
+
+    def add(self, values):
+        values = np.asarray(values, dtype=np.int64)
+        positive = values[values > 0]
+        self.zero_count += int(len(values) - len(positive))
+
+        indices, counts = np.unique(bucket_indices(positive), return_counts=True)
+        self.counts.update(dict(zip(indices.tolist(), counts.tolist())))
+
+    def merge(self, other):
+        self.counts.update(other.counts)
+        self.zero_count += other.zero_count
+
+        return self
+
+    def quantile(self, q):
+        """
+        The q-quantile (0 <= q <= 1) of the added durations, None if empty.
+        """
+        count = len(self)
+
+        if not count:
+            return None
+
+        rank = q * (count - 1)
+
+        if rank < self.zero_count:
+            return 0.0
+
+        seen = self.zero_count
+
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+
+            if seen > rank:
+                # The value with equal relative error to both bucket bounds
+                return 2 * GAMMA ** index / (GAMMA + 1)
+
+    def to_json(self):
+        return {"counts": dict(self.counts), "zero_count": self.zero_count}
+
+
+def triage_durations(table, events):
+    """
+    Seconds from when each issue first needed triage (the label added, or its
+    creation when the label was only ever removed) to when the label was
+    first removed, with the month that happened. NULL_TIMESTAMP if untriaged.
+    """
+    triaged_at = events.first_unlabeled(label_needs_triage)
+    started_at = events.first_labeled(label_needs_triage)
+    started_at = np.where(
+        (started_at == NULL_TIMESTAMP) | (started_at > triaged_at), table.created_at, started_at
+    )
+
+    return np.where(triaged_at == NULL_TIMESTAMP, NULL_TIMESTAMP, triaged_at - started_at), triaged_at
+
+
+def close_durations(table):
+    """
+    Seconds from creation to closing of each closed issue, with the month it
+    closed. NULL_TIMESTAMP for open issues.
+    """
+    closed = table.closed_mask & (table.closed_at != NULL_TIMESTAMP)
+
+    return np.where(closed, table.closed_at - table.created_at, NULL_TIMESTAMP), table.closed_at
+
+
+def month_key(code):
+    return f"{1970 + code // 12}-{code % 12 + 1:02d}"
+
+
+class DurationSketches:
+    """
+    {metric: {component: {"YYYY-MM": QuantileSketch}}}, a sketch per month
+    the durations ended in. Stores built from separate snapshots or targets
+    merge bucket by bucket. `as_of` ("YYYY-MM") is the month of the newest
+    snapshot a stored history was sketched from.
+    """
+
+    def __init__(self, sketches=None, as_of=None):
+        self.as_of = as_of or (sketches or {}).get("as_of")
+        self.sketches = {
+            metric: {
+                component: {
+                    month: QuantileSketch(**sketch) for month, sketch in months.items()
+                }
+                for component, months in (sketches or {}).get(metric, {}).items()
+            }
+            for metric in METRICS
+        }
+
+    @classmethod
+    def from_issues(cls, table, events):
+        """
+        Sketch the durations of normalized issues and their timeline events.
+        Every duration is bucketed with one pass of np.unique over
+        (component, month, log bucket) triples.
+        """
+        store = cls()
+        rows, members, label_ids = table.label_index.family_pairs(COMPONENT_PREFIX)
+        components = [
+            table.labels.names[label_id].replace(COMPONENT_PREFIX, "") for label_id in label_ids
+        ]
+
+        for metric, (durations, ended_at) in {
+            "triage": triage_durations(table, events),
+            "close": close_durations(table),
+        }.items():
+            valid = (durations != NULL_TIMESTAMP) & (durations >= 0)
+            months = month_codes(ended_at)
+
+            # The "All" bucket (-1) counts every issue once, the components
+            # each issue carries count it again
+            keep = valid[rows]
+            issue_rows = np.concatenate([np.flatnonzero(valid), rows[keep]])
+            component_ids = np.concatenate([
+                np.full(int(valid.sum()), -1, dtype=np.int64), members[keep].astype(np.int64)
+            ])
+
+            values = durations[issue_rows]
+            indices = np.zeros(len(values), dtype=np.int64)
+            indices[values > 0] = bucket_indices(values[values > 0])
+            zero = values == 0
+
+            keys, counts = np.unique(
+                np.stack([component_ids, months[issue_rows], indices, zero]), axis=1, return_counts=True
+            )
+
+            for (component_id, month, index, is_zero), count in zip(keys.T.tolist(), counts.tolist()):
+                component = ALL_COMPONENTS if component_id < 0 else components[component_id]
+                sketch = store.sketches[metric].setdefault(component, {}).setdefault(
+                    month_key(month), QuantileSketch()
+                )
+
+                if is_zero:
+                    sketch.zero_count += count
+                else:
+                    sketch.counts[index] += count
+
+        return store
+
+    def merge(self, other):
+        for metric, components in other.sketches.items():
+            for component, months in components.items():
+                for month, sketch in months.items():
+                    self.sketches[metric].setdefault(component, {}).setdefault(
+                        month, QuantileSketch()
+                    ).merge(sketch)
+
+        return self
+
+    def replace(self, other, first):
+        """
+        Replace the months from `first` ("YYYY-MM") on with those of `other`,
+        keeping the earlier ones.
+        """
+        for metric in METRICS:
+            components = {}
+
+            for component, months in self.sketches[metric].items():
+                kept = {month: sketch for month, sketch in months.items() if month < first}
+
+                if kept:
+                    components[component] = kept
+
+            for component, months in other.sketches[metric].items():
+                components.setdefault(component, {}).update(
+                    {month: sketch for month, sketch in months.items() if month >= first}
+                )
+
+            self.sketches[metric] = components
+
+        return self
+
+    def components(self):
+        return sorted({component for metric in METRICS for component in self.sketches[metric]})
+
+    def sketch(self, metric, component=ALL_COMPONENTS, first=None, last=None):
+        """
+        The merged sketch of a metric for a component over the months from
+        `first` to `last` ("YYYY-MM", inclusive, open-ended when None).
+        """
+        merged = QuantileSketch()
+
+        for month, sketch in self.sketches[metric].get(component, {}).items():
+            if (first is None or month >= first) and (last is None or month <= last):
+                merged.merge(sketch)
+
+        return merged
+
+    def to_json(self):
+        stored = {
+            metric: {
+                component: {month: sketch.to_json() for month, sketch in sorted(months.items())}
+                for component, months in sorted(components.items())
+            }
+            for metric, components in self.sketches.items()
+        }
+
+        return {**stored, "as_of": self.as_of} if self.as_of else stored
+
+
+def sketches_path(collection, prefix=""):
+    """
+    Where the sketches of an output prefix are stored: each target's in its
+    partition, the combined targets' in data/.
+    """
+    if not prefix:
+        return os.path.join(data_dir, SKETCHES_NAME)
+
+    targets = {f"{target['name']}/": target for target in collection["targets"]}
+
+    return partition_path(targets[prefix], SKETCHES_NAME)
+
+
+def load_sketches(path):
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No duration sketches at {path}; run `python cli.py export` first")
+
+    with open(path, "r") as json_file:
+        return DurationSketches(json.load(json_file))
+
+
+def save_sketches(store, path, as_of=None):
+    """
+    Store the sketches of a snapshot taken in the month `as_of` ("YYYY-MM")
+    at `path`. Only the stored months from the stored snapshot's month on
+    are replaced: the earlier ones were complete in that snapshot, which
+    also held the long-lived issues the current one-year snapshot no longer
+    does, so the stored history grows past the window and keeps them.
+    """
+    if as_of is not None and os.path.exists(path):
+        stored = load_sketches(path)
+        # A stored history without its month is replaced whole
+        store = stored.replace(store, stored.as_of or "")
+        store.as_of = max(as_of, stored.as_of or as_of)
+    else:
+        store.as_of = as_of
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    with open(path, "w") as json_file:
+        json.dump(store.to_json(), json_file)
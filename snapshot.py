@@ -0,0 +1,289 @@
+import fcntl
+import json
+import os
+import shutil
+import numpy as np
+
+from contextlib import contextmanager
+
+# Same bit pattern as numpy's NaT, so timestamp columns can be viewed as datetime64[s]
+NULL_TIMESTAMP = np.iinfo(np.int64).min
+
+STATES = ["OPEN", "CLOSED"]
+EVENT_TYPES = ["LabeledEvent", "UnlabeledEvent"]
+
+ISSUE_COLUMNS = [
+    "number",
+    "created_at",
+    "updated_at",
+    "closed_at",
+    "state",
+    "id_offsets",
+    "ids",
+    "title_offsets",
+    "titles",
+    "label_offsets",
+    "label_ids",
+]
+EVENT_COLUMNS = [
+    "event_issue",
+    "event_type",
+    "event_label",
+    "event_created_at",
+]
+
+
+def parse_timestamps(values):
+    """
+    Parse GitHub `YYYY-MM-DDTHH:MM:SSZ` strings (or None) into int64 epoch seconds.
+    """
+    return np.array(
+        [value[:19] if value else "NaT" for value in values], dtype="datetime64[s]"
+    ).view(np.int64)
+
+
+def format_timestamp(value):
+    if value == NULL_TIMESTAMP:
+        return None
+
+    return f"{np.datetime64(int(value), 's')}Z"
+
+
+def encode_strings(values):
+    """
+    Pack strings into one UTF-8 byte blob plus an offsets array.
+    """
+    encoded = [value.encode("utf-8") for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+
+    return offsets, np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+
+class LabelDictionary:
+    """
+    Interns label names to small, stable integer ids.
+    """
+
+    def __init__(self, names=None):
+        self.names = list(names or [])
+        self.ids = {name: label_id for label_id, name in enumerate(self.names)}
+
+    def intern(self, name):
+        if name not in self.ids:
+            self.ids[name] = len(self.names)
+            self.names.append(name)
+
+        return self.ids[name]
+
+    def get(self, name, default=-1):
+        return self.ids.get(name, default)
+
+    def __len__(self):
+        return len(self.names)
+
+
+class Snapshot:
+    """
+    Columnar view over a snapshot directory. Every column is a memory-mapped
+    numpy array, so opening a snapshot does not read the data itself.
+    """
+
+    def __init__(self, columns, labels):
+        self.columns = columns
+        self.labels = labels
+
+    def __getattr__(self, name):
+        try:
+            return self.__dict__["columns"][name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __len__(self):
+        return len(self.columns["number"])
+
+    def _string(self, blob, offsets, index):
+        return bytes(blob[offsets[index]:offsets[index + 1]]).decode("utf-8")
+
+    def title(self, index):
+        return self._string(self.titles, self.title_offsets, index)
+
+    def node_id(self, index):
+        return self._string(self.ids, self.id_offsets, index)
+
+    def issue_labels(self, index):
+        label_ids = self.label_ids[self.label_offsets[index]:self.label_offsets[index + 1]]
+
+        return [self.labels.names[label_id] for label_id in label_ids]
+
+    def _events(self, index):
+        return {
+            "__typename": EVENT_TYPES[self.event_type[index]],
+            "createdAt": format_timestamp(self.event_created_at[index]),
+            "label": {"name": self.labels.names[self.event_label[index]]},
+        }
+
+    def _issue(self, index, events):
+        return {
+            "id": self.node_id(index),
+            "title": self.title(index),
+            "number": int(self.number[index]),
+            "createdAt": format_timestamp(self.created_at[index]),
+            "updatedAt": format_timestamp(self.updated_at[index]),
+            "closedAt": format_timestamp(self.closed_at[index]),
+            "state": STATES[self.state[index]],
+            "labels": {
+                "nodes": [{"name": name} for name in self.issue_labels(index)],
+            },
+            "timelineItems": {"nodes": events},
+        }
+
+    def to_issues(self):
+        """
+        Rebuild the GraphQL-shaped issue dicts stored in `issues.json`.
+        """
+        events_by_issue = [[] for _ in range(len(self))]
+
+        for index, issue_index in enumerate(self.event_issue.tolist()):
+            events_by_issue[issue_index].append(self._events(index))
+
+        return [self._issue(index, events_by_issue[index]) for index in range(len(self))]
+
+    def find(self, number):
+        """
+        The GraphQL-shaped issue with the given number, None if not stored.
+        """
+        rows = np.flatnonzero(self.number == number)
+
+        if not len(rows):
+            return None
+
+        index = int(rows[0])
+
+        return self._issue(index, [self._events(event) for event in np.flatnonzero(self.event_issue == index)])
+
+
+def build_columns(issues, labels=None):
+    labels = labels or LabelDictionary()
+
+    label_counts = []
+    label_ids = []
+    event_issue = []
+    event_type = []
+    event_label = []
+    event_created_at = []
+
+    for index, issue in enumerate(issues):
+        issue_labels = [label["name"] for label in issue.get("labels", {}).get("nodes", [])]
+        label_counts.append(len(issue_labels))
+        label_ids.extend(labels.intern(name) for name in issue_labels)
+
+        for item in issue.get("timelineItems", {}).get("nodes", []):
+            if "label" not in item:
+                continue
+
+            event_issue.append(index)
+            event_type.append(EVENT_TYPES.index(item["__typename"]))
+            event_label.append(labels.intern(item["label"]["name"]))
+            event_created_at.append(item["createdAt"])
+
+    label_offsets = np.zeros(len(issues) + 1, dtype=np.int64)
+    np.cumsum(label_counts, out=label_offsets[1:])
+    id_offsets, ids = encode_strings([issue.get("id", "") for issue in issues])
+    title_offsets, titles = encode_strings([issue.get("title", "") for issue in issues])
+
+    columns = {
+        "number": np.array([issue["number"] for issue in issues], dtype=np.int64),
+        "created_at": parse_timestamps([issue["createdAt"] for issue in issues]),
+        "updated_at": parse_timestamps([issue.get("updatedAt") for issue in issues]),
+        "closed_at": parse_timestamps([issue.get("closedAt") for issue in issues]),
+        "state": np.array([STATES.index(issue["state"]) for issue in issues], dtype=np.uint8),
+        "id_offsets": id_offsets,
+        "ids": ids,
+        "title_offsets": title_offsets,
+        "titles": titles,
+        "label_offsets": label_offsets,
+        "label_ids": np.array(label_ids, dtype=np.int32),
+        "event_issue": np.array(event_issue, dtype=np.int32),
+        "event_type": np.array(event_type, dtype=np.uint8),
+        "event_label": np.array(event_label, dtype=np.int32),
+        "event_created_at": parse_timestamps(event_created_at),
+    }
+
+    return columns, labels
+
+
+@contextmanager
+def snapshot_lock(path, shared=False):
+    """
+    Lock a snapshot path across processes: exclusively while a new snapshot
+    is swapped in, shared while one is opened.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    with open(f"{path}.lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def write_snapshot(issues, path):
+    """
+    Write issues as a columnar snapshot directory. The new snapshot is built
+    next to the old one and swapped in under the snapshot lock, so readers
+    never see a partial write or no snapshot at all.
+    """
+    columns, labels = build_columns(issues)
+    tmp_path = f"{path}.tmp"
+    old_path = f"{path}.old"
+
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    for name, column in columns.items():
+        np.save(os.path.join(tmp_path, f"{name}.npy"), column)
+
+    with open(os.path.join(tmp_path, "labels.json"), "w") as json_file:
+        json.dump(labels.names, json_file)
+
+    shutil.rmtree(old_path, ignore_errors=True)
+
+    with snapshot_lock(path):
+        if os.path.exists(path):
+            os.replace(path, old_path)
+
+        os.replace(tmp_path, path)
+
+    # Readers of the old snapshot keep their memory maps
+    shutil.rmtree(old_path, ignore_errors=True)
+
+
+def read_snapshot(path, missing_ok=False):
+    """
+    Memory-map a snapshot. With `missing_ok`, None when there is none.
+    """
+    with snapshot_lock(path, shared=True):
+        if missing_ok and not snapshot_exists(path):
+            return None
+
+        with open(os.path.join(path, "labels.json"), "r") as json_file:
+            labels = LabelDictionary(json.load(json_file))
+
+        columns = {
+            name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+            for name in ISSUE_COLUMNS + EVENT_COLUMNS
+        }
+
+    return Snapshot(columns, labels)
+
+
+def snapshot_exists(path):
+    return os.path.exists(os.path.join(path, "labels.json"))
+
+
+def export_json(issues, path):
+    with open(path, "w") as json_file:
+        json.dump(issues, json_file)
@@ -1,4 +1,6 @@
-import pandas as pd
+from artifacts import write_csv, write_workbook
+from buckets import SECONDS_PER_DAY, count_by_period, month_codes, period_labels, periods_since, to_timestamp
+from sketches import ALL_COMPONENTS, METRICS, QUANTILES, month_key
 
 from issues import (
     label_v9,
@@ -14,121 +16,228 @@ from datetime import datetime, timedelta
 
 SPREADSHEET_PATH = "spreadsheets"
 
+# Every chart and spreadsheet table, a sheet each
+WORKBOOK_NAME = "issue_stats.xlsx"
 
-def overall_issue_stats(issues):
-    # Convert issues to DataFrame
-    df_issues = pd.DataFrame(issues)
-    df_issues["createdAt"] = pd.to_datetime(df_issues["createdAt"], yearfirst=True)
-    # Filter open issues
-    df_issues = df_issues[df_issues["state"] == "OPEN"]
+# Optional issue fields (see issues.ISSUE_FIELDS) each spreadsheet reads
+SPREADSHEET_FIELDS = {
+    "overall_issue_stats": {"labels"},
+    "monthly_stats": {"closedAt"},
+    "component_stats": {"labels"},
+    "component_durations": {"labels", "closedAt", "timelineItems"},
+    "monthly_durations": {"labels", "closedAt", "timelineItems"},
+}
 
-    # Identify Bugs, Features, and Epics
-    bugs = df_issues[
-        df_issues["labels"].apply(
-            lambda x: label_bug in x or not (label_feature in x or label_epic in x)
-        )
-    ]
-    features = df_issues[df_issues["labels"].apply(lambda x: label_feature in x)]
-    epics = df_issues[df_issues["labels"].apply(lambda x: label_epic in x)]
+# Shared intermediate products (pipeline nodes) each spreadsheet reads
+SPREADSHEET_INPUTS = {
+    "overall_issue_stats": [],
+    "monthly_stats": [],
+    "component_stats": ["label_index"],
+    "component_durations": ["duration_sketches"],
+    "monthly_durations": ["duration_sketches"],
+}
 
-    data = [
-        ["Bugs", len(bugs)],
-        ["Features", len(features)],
-        ["Epics", len(epics)],
-    ]
 
-    total_issues = len(bugs) + len(features) + len(epics)
+def open_type_masks(open_mask, label_mask):
+    """
+    Open bugs, features and epics; issues without a type count as bugs.
+    `label_mask(name)` is the issues carrying a label.
+    """
+    feature_mask = label_mask(label_feature)
+    epic_mask = label_mask(label_epic)
+    bug_mask = label_mask(label_bug) | ~(feature_mask | epic_mask)
+
+    return {
+        "bugs": open_mask & bug_mask,
+        "features": open_mask & feature_mask,
+        "epics": open_mask & epic_mask,
+    }
+
+
+def overall_issue_stats_table(bugs, features, epics):
+    total_issues = bugs + features + epics
+
+    return {
+        "Type": ["Bugs", "Features", "Epics"],
+        f"Count (Total: {total_issues})": [bugs, features, epics],
+    }
+
+
+def overall_issue_stats(context, path=SPREADSHEET_PATH):
+    masks = open_type_masks(context.open_mask, context.label_mask)
+    issue_stats = overall_issue_stats_table(*[int(mask.sum()) for mask in masks.values()])
+
+    write_csv(issue_stats, f"{path}/overall_issue_stats")
+
+    return issue_stats
+
 
-    issue_stats_df = pd.DataFrame(
-        data, columns=["Type", f"Count (Total: {total_issues})"]
+def monthly_stats_table(codes, opened, closed):
+    return {
+        "Month": period_labels(codes, "month"),
+        "Opened Issues": list(opened),
+        "Closed Issues": list(closed),
+    }
+
+
+def monthly_stats(context, path=SPREADSHEET_PATH):
+    issues = context.issues
+    end = to_timestamp(context.as_of)
+
+    # Every month from the oldest issue up to `as_of`, including empty ones
+    codes, counts = count_by_period(
+        {"opened": issues.created_at, "closed": issues.closed_at},
+        "month",
+        end,
+        periods_since(issues.created_at, "month", end),
     )
 
-    issue_stats_df.to_excel(f"{SPREADSHEET_PATH}/overall_issue_stats.xlsx", index=False)
-    issue_stats_df.to_csv(f"{SPREADSHEET_PATH}/overall_issue_stats.csv", index=False)
+    monthly_stats = monthly_stats_table(codes, counts["opened"].tolist(), counts["closed"].tolist())
 
+    write_csv(monthly_stats, f"{path}/monthly_stats")
 
-def monthly_stats(issues):
-    # Convert issues to DataFrame
-    df_issues = pd.DataFrame(issues)
-    df_issues["createdAt"] = pd.to_datetime(df_issues["createdAt"], yearfirst=True)
-    df_issues["closedAt"] = pd.to_datetime(df_issues["closedAt"], yearfirst=True)
+    return monthly_stats
 
-    # Group by year and month for opened issues
-    data_opened = (
-        df_issues.groupby(
-            [df_issues["createdAt"].dt.year, df_issues["createdAt"].dt.month_name()]
-        )["number"]
-        .count()
-        .reset_index(name="Opened Issues")
+
+def component_counts(label_index, open_mask, label_mask):
+    """
+    {component label: (open, open bugs, open features)} in label id order.
+    """
+    masks = open_type_masks(open_mask, label_mask)
+    label_ids, counts = label_index.family_counts(
+        "Component:",
+        {"open": open_mask, "bugs": masks["bugs"], "features": masks["features"]},
     )
 
-    # Group by year and month for closed issues
-    data_closed = (
-        df_issues.dropna(subset=["closedAt"])
-        .groupby(
-            [df_issues["closedAt"].dt.year, df_issues["closedAt"].dt.month_name()]
-        )["number"]
-        .count()
-        .reset_index(name="Closed Issues")
+    return {
+        label_index.labels.names[label_id]: (
+            int(counts["open"][index]), int(counts["bugs"][index]), int(counts["features"][index])
+        )
+        for index, label_id in enumerate(label_ids)
+    }
+
+
+def component_stats_table(components):
+    # Components with open issues, the most issues first
+    rows = sorted(
+        (
+            [name.replace("Component: ", ""), bugs, features, bugs + features]
+            for name, (open_count, bugs, features) in components.items()
+            if open_count > 0
+        ),
+        key=lambda row: -row[3],
     )
 
-    # Merge opened and closed data
-    monthly_stats = pd.merge(
-        data_opened, data_closed, on=["createdAt", "closedAt"], how="outer"
-    ).fillna(0)
+    return {
+        column: [row[index] for row in rows]
+        for index, column in enumerate(["Component", "Bugs", "Features", "Total"])
+    }
 
-    dates = []
 
-    for index in data_opened.index:
-        formatted_index = f"{index[0]} {index[1]}"
-        dates.append(formatted_index)
+def component_stats(context, path=SPREADSHEET_PATH):
+    component_stats = component_stats_table(
+        component_counts(context.label_index, context.open_mask, context.label_mask)
+    )
 
-    monthly_stats["Month"] = dates
-    monthly_stats.sort_index(ascending=False, inplace=True)
+    write_csv(component_stats, f"{path}/component_stats")
 
-    monthly_stats.to_excel(f"{SPREADSHEET_PATH}/monthly_stats.xlsx", index=False)
-    monthly_stats.to_csv(f"{SPREADSHEET_PATH}/monthly_stats.csv", index=False)
+    return component_stats
 
 
-def component_stats(issues):
-    # Convert issues to DataFrame
-    df_issues = pd.DataFrame(issues)
-    df_issues["createdAt"] = pd.to_datetime(df_issues["createdAt"], yearfirst=True)
-    # Filter open issues
-    df_issues = df_issues[df_issues["state"] == "OPEN"]
+def duration_columns(sketches):
+    """
+    Issue counts and p50/p90/p99 days of a row's merged sketch per metric.
+    """
+    columns = {}
 
-    # Extract component names
-    component_names = set()
-    for labels in df_issues["labels"]:
-        for label in labels:
-            if label.startswith("Component:"):
-                component_names.add(label.replace("Component: ", ""))
+    for metric in METRICS:
+        sketch = sketches[metric]
+        columns[f"{metric.capitalize()} Count"] = len(sketch)
 
-    component_data = []
+        for name, q in QUANTILES.items():
+            seconds = sketch.quantile(q)
+            columns[f"{metric.capitalize()} {name} (days)"] = (
+                None if seconds is None else round(seconds / SECONDS_PER_DAY, 1)
+            )
 
-    for component_name in component_names:
-        component_label = f"Component: {component_name}"
-        component_issues = df_issues[
-            df_issues["labels"].apply(lambda labels: component_label in labels)
-        ]
+    return columns
 
-        bugs = component_issues[
-            component_issues["labels"].apply(
-                lambda x: label_bug in x or not (label_feature in x or label_epic in x)
-            )
-        ]
-        features = component_issues[
-            component_issues["labels"].apply(lambda x: label_feature in x)
-        ]
-        total = len(bugs) + len(features)
 
-        component_data.append([component_name, len(bugs), len(features), total])
+def duration_table(keys, key_column, rows):
+    table = {key_column: keys}
 
-    component_stats = pd.DataFrame(
-        component_data, columns=["Component", "Bugs", "Features", "Total"]
-    )
+    for row in rows:
+        for column, value in row.items():
+            table.setdefault(column, []).append(value)
+
+    return table
+
+
+def past_year_months(as_of):
+    last = int(month_codes([to_timestamp(as_of)])[0])
+
+    return [month_key(code) for code in range(last, last - 12, -1)]
+
+
+def component_durations_table(store, as_of):
+    # Time to triage and to close of the issues triaged or closed in the past
+    # 12 months, per component; "All" counts each issue once
+    months = past_year_months(as_of)
+    components = [ALL_COMPONENTS] + [
+        component for component in store.components() if component != ALL_COMPONENTS
+    ]
+
+    rows = [
+        duration_columns({
+            metric: store.sketch(metric, component, months[-1], months[0]) for metric in METRICS
+        })
+        for component in components
+    ]
+
+    return duration_table(components, "Component", rows)
+
+
+def component_durations(context, path=SPREADSHEET_PATH):
+    component_durations = component_durations_table(context.duration_sketches, context.as_of)
+
+    write_csv(component_durations, f"{path}/component_durations")
+
+    return component_durations
+
+
+def monthly_durations_table(store, as_of):
+    # Time to triage and to close per month the issues were triaged or
+    # closed in, newest first
+    months = past_year_months(as_of)
+
+    rows = [
+        duration_columns({metric: store.sketch(metric, first=month, last=month) for metric in METRICS})
+        for month in months
+    ]
+
+    return duration_table(months, "Month", rows)
+
+
+def monthly_durations(context, path=SPREADSHEET_PATH):
+    monthly_durations = monthly_durations_table(context.duration_sketches, context.as_of)
+
+    write_csv(monthly_durations, f"{path}/monthly_durations")
+
+    return monthly_durations
+
+
+SPREADSHEETS = {
+    "overall_issue_stats": overall_issue_stats,
+    "monthly_stats": monthly_stats,
+    "component_stats": component_stats,
+    "component_durations": component_durations,
+    "monthly_durations": monthly_durations,
+}
 
-    component_stats.sort_values(by="Total", ascending=False, inplace=True)
 
-    component_stats.to_excel(f"{SPREADSHEET_PATH}/component_stats.xlsx", index=False)
-    component_stats.to_csv(f"{SPREADSHEET_PATH}/component_stats.csv", index=False)
+def export_workbook(sheets, path=SPREADSHEET_PATH):
+    """
+    Write every table of `sheets` ({sheet name: table}) to one workbook in
+    a single streamed pass.
+    """
+    write_workbook(sheets, f"{path}/{WORKBOOK_NAME}")
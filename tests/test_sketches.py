@@ -0,0 +1,53 @@
+from datetime import datetime
+
+from analysis import AnalysisContext
+from issue_table import IssueTable
+from pipeline import duration_sketches_node
+from sketches import load_sketches, sketches_path
+from snapshot import build_columns
+
+COLLECTION = {"targets": [], "aggregate": ["combined"]}
+
+
+def closed_issue(number, created_at, closed_at):
+    return {
+        "id": f"I_{number}",
+        "title": f"Issue {number}",
+        "number": number,
+        "createdAt": created_at,
+        "updatedAt": closed_at,
+        "closedAt": closed_at,
+        "state": "CLOSED",
+        "labels": {"nodes": [{"name": "Component: Button"}]},
+        "timelineItems": {"nodes": []},
+    }
+
+
+def export_sketches(issues, as_of):
+    context = AnalysisContext(IssueTable(*build_columns(issues)), as_of=as_of)
+    duration_sketches_node({"": context}, COLLECTION)
+
+    return load_sketches(sketches_path(COLLECTION))
+
+
+def test_later_snapshot_keeps_complete_months(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    long_lived = closed_issue(1, "2025-03-02T00:00:00Z", "2026-01-20T00:00:00Z")
+    recent = closed_issue(2, "2025-12-01T00:00:00Z", "2026-01-10T00:00:00Z")
+    reopened = closed_issue(3, "2026-04-01T00:00:00Z", "2026-05-10T00:00:00Z")
+
+    first = export_sketches([long_lived, recent, reopened], datetime(2026, 5, 15))
+    january = first.sketch("close", first="2026-01", last="2026-01").to_json()
+
+    # A month later the long-lived issue left the one-year snapshot, and the
+    # May issue closed again later
+    reopened = closed_issue(3, "2026-04-01T00:00:00Z", "2026-06-02T00:00:00Z")
+    second = export_sketches([recent, reopened], datetime(2026, 6, 15))
+
+    assert second.as_of == "2026-06"
+    assert second.sketch("close", first="2026-01", last="2026-01").to_json() == january
+    assert len(second.sketch("close", "Button", "2026-01", "2026-01")) == 2
+    # Months from the stored snapshot's month on are replaced
+    assert len(second.sketch("close", first="2026-05", last="2026-05")) == 0
+    assert len(second.sketch("close", first="2026-06", last="2026-06")) == 1
@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+
+import windows
+
+from issues import compact_deltas, label_v9, load_stored_issues, partition_path
+from snapshot import write_snapshot
+from webhooks import WebhookReceiver
+
+REPO = "microsoft/fluentui"
+
+
+def timestamp(days_ago):
+    return (datetime.now() - timedelta(days=days_ago)).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def stored_issue(number, created_days_ago):
+    return {
+        "id": f"I_{number}",
+        "title": f"Issue {number}",
+        "number": number,
+        "createdAt": timestamp(created_days_ago),
+        "updatedAt": timestamp(created_days_ago),
+        "closedAt": None,
+        "state": "OPEN",
+        "labels": {"nodes": [{"name": label_v9}]},
+        "timelineItems": {"nodes": []},
+    }
+
+
+def delivery(action, number, created_days_ago, label=None):
+    payload = {
+        "action": action,
+        "repository": {"full_name": REPO},
+        "issue": {
+            "node_id": f"I_{number}",
+            "title": f"Issue {number}",
+            "number": number,
+            "created_at": timestamp(created_days_ago),
+            "updated_at": timestamp(0),
+            "closed_at": timestamp(0) if action == "closed" else None,
+            "state": "closed" if action == "closed" else "open",
+            "labels": [{"name": label_v9}] + ([{"name": label}] if label else []),
+        },
+    }
+
+    if label:
+        payload["label"] = {"name": label}
+
+    return payload
+
+
+def test_windows_match_recount_after_compaction(tmp_path):
+    target = {"name": "v9", "repo": REPO, "label": label_v9, "path": str(tmp_path)}
+    write_snapshot([stored_issue(1, 40), stored_issue(2, 10)], partition_path(target, "snapshot"))
+    windows.update_windows([], load_stored_issues(target), False, target)
+
+    receiver = WebhookReceiver("secret", [target])
+
+    assert receiver.apply(delivery("closed", 1, 40)) == 1
+    assert receiver.apply(delivery("labeled", 2, 10, "Needs: Triage :mag:")) == 1
+    assert receiver.apply(delivery("opened", 3, 0)) == 1
+    # Created before the one-year window: compaction would drop it
+    assert receiver.apply(delivery("closed", 4, 800)) == 0
+
+    compact_deltas(target)
+
+    stored = windows.load_windows(windows.target_windows_path(target))
+    recount = windows.WindowAggregator()
+    recount.apply_all(load_stored_issues(target))
+    recount.evict()
+
+    assert stored.contributions == recount.contributions
+    assert stored.counters == recount.counters
@@ -0,0 +1,267 @@
+import hashlib
+import json
+import sqlite3
+
+from datetime import datetime, timezone
+
+from issue_table import STATE_OPEN
+from snapshot import (
+    EVENT_TYPES,
+    NULL_TIMESTAMP,
+    STATES,
+    read_snapshot,
+    snapshot_exists,
+    write_snapshot,
+)
+
+WAREHOUSE_PATH = "data/warehouse.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    month TEXT PRIMARY KEY,
+    digest TEXT NOT NULL,
+    ingested_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS labels (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS issues (
+    month TEXT NOT NULL,
+    number INTEGER NOT NULL,
+    created_at INTEGER NOT NULL,
+    closed_at INTEGER,
+    state TEXT NOT NULL,
+    PRIMARY KEY (month, number)
+);
+
+CREATE TABLE IF NOT EXISTS issue_labels (
+    month TEXT NOT NULL,
+    number INTEGER NOT NULL,
+    label_id INTEGER NOT NULL REFERENCES labels (id),
+    PRIMARY KEY (month, number, label_id)
+);
+CREATE INDEX IF NOT EXISTS issue_labels_by_label ON issue_labels (label_id, month);
+
+CREATE TABLE IF NOT EXISTS events (
+    month TEXT NOT NULL,
+    number INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    label_id INTEGER NOT NULL REFERENCES labels (id),
+    created_at INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_by_label ON events (label_id, type, created_at);
+CREATE INDEX IF NOT EXISTS events_by_issue ON events (month, number);
+
+-- Materialized views, refreshed per snapshot month on ingest
+CREATE TABLE IF NOT EXISTS open_by_component_month (
+    month TEXT NOT NULL,
+    component TEXT NOT NULL,
+    open_issues INTEGER NOT NULL,
+    PRIMARY KEY (month, component)
+);
+
+CREATE TABLE IF NOT EXISTS opened_closed_by_month (
+    month TEXT NOT NULL,
+    period TEXT NOT NULL,
+    opened INTEGER NOT NULL,
+    closed INTEGER NOT NULL,
+    PRIMARY KEY (month, period)
+);
+"""
+
+SNAPSHOT_TABLES = [
+    "issues",
+    "issue_labels",
+    "events",
+    "open_by_component_month",
+    "opened_closed_by_month",
+]
+
+
+def connect(path=WAREHOUSE_PATH):
+    connection = sqlite3.connect(path)
+    connection.executescript(SCHEMA)
+
+    return connection
+
+
+def snapshot_digest(snapshot):
+    digest = hashlib.sha256()
+
+    for name in ["number", "updated_at", "closed_at", "state", "label_offsets", "label_ids"]:
+        digest.update(snapshot.columns[name].tobytes())
+
+    return digest.hexdigest()
+
+
+def load_month_snapshot(month):
+    """
+    Read `data/<month>/snapshot`, converting `data/<month>/issues.json` into
+    one first if the month only has the JSON export.
+    """
+    path = f"data/{month}/snapshot"
+
+    if not snapshot_exists(path):
+        with open(f"data/{month}/issues.json", "r") as json_file:
+            write_snapshot(json.load(json_file), path)
+
+    return read_snapshot(path)
+
+
+def _label_ids(connection, names):
+    connection.executemany(
+        "INSERT OR IGNORE INTO labels (name) VALUES (?)", [(name,) for name in names]
+    )
+
+    return {
+        name: label_id
+        for label_id, name in connection.execute("SELECT id, name FROM labels")
+    }
+
+
+def ingest_snapshot(connection, month, snapshot, force=False):
+    """
+    Load one monthly snapshot into the warehouse and refresh that month's
+    rows of the materialized views. Snapshots already ingested with the same
+    content are skipped. Returns whether anything was written.
+    """
+    digest = snapshot_digest(snapshot)
+    row = connection.execute("SELECT digest FROM snapshots WHERE month = ?", (month,)).fetchone()
+
+    if row and row[0] == digest and not force:
+        return False
+
+    with connection:
+        for name in SNAPSHOT_TABLES:
+            connection.execute(f"DELETE FROM {name} WHERE month = ?", (month,))
+
+        columns = snapshot.columns
+        label_ids = _label_ids(connection, snapshot.labels.names)
+        warehouse_ids = [label_ids[name] for name in snapshot.labels.names]
+        numbers = columns["number"].tolist()
+        closed_at = columns["closed_at"].tolist()
+
+        connection.executemany(
+            "INSERT INTO issues VALUES (?, ?, ?, ?, ?)",
+            [
+                (month, number, created, None if closed == NULL_TIMESTAMP else closed, STATES[state])
+                for number, created, closed, state in zip(
+                    numbers,
+                    columns["created_at"].tolist(),
+                    closed_at,
+                    columns["state"].tolist(),
+                )
+            ],
+        )
+
+        offsets = columns["label_offsets"].tolist()
+        issue_label_ids = columns["label_ids"].tolist()
+        connection.executemany(
+            "INSERT OR IGNORE INTO issue_labels VALUES (?, ?, ?)",
+            [
+                (month, numbers[row], warehouse_ids[issue_label_ids[position]])
+                for row in range(len(numbers))
+                for position in range(offsets[row], offsets[row + 1])
+            ],
+        )
+
+        connection.executemany(
+            "INSERT INTO events VALUES (?, ?, ?, ?, ?)",
+            [
+                (month, numbers[row], EVENT_TYPES[event_type], warehouse_ids[label], created)
+                for row, event_type, label, created in zip(
+                    columns["event_issue"].tolist(),
+                    columns["event_type"].tolist(),
+                    columns["event_label"].tolist(),
+                    columns["event_created_at"].tolist(),
+                )
+            ],
+        )
+
+        refresh_views(connection, month)
+
+        connection.execute(
+            "INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?)",
+            (month, digest, datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")),
+        )
+
+    return True
+
+
+def refresh_views(connection, month):
+    connection.execute(
+        """
+        INSERT INTO open_by_component_month (month, component, open_issues)
+        SELECT issues.month, substr(labels.name, length('Component: ') + 1), count(*)
+        FROM issues
+        JOIN issue_labels USING (month, number)
+        JOIN labels ON labels.id = issue_labels.label_id
+        WHERE issues.month = ? AND issues.state = ? AND labels.name LIKE 'Component: %'
+        GROUP BY labels.name
+        """,
+        (month, STATES[STATE_OPEN]),
+    )
+
+    connection.execute(
+        """
+        INSERT INTO opened_closed_by_month (month, period, opened, closed)
+        SELECT ?, period, sum(opened), sum(closed)
+        FROM (
+            SELECT strftime('%Y-%m', created_at, 'unixepoch') AS period, 1 AS opened, 0 AS closed
+            FROM issues WHERE month = ?
+            UNION ALL
+            SELECT strftime('%Y-%m', closed_at, 'unixepoch'), 0, 1
+            FROM issues WHERE month = ? AND closed_at IS NOT NULL
+        )
+        GROUP BY period
+        """,
+        (month, month, month),
+    )
+
+
+def ingest_months(months, connection=None):
+    """
+    Make sure every `data/<month>` snapshot is in the warehouse.
+    """
+    connection = connection or connect()
+
+    for month in months:
+        ingest_snapshot(connection, month, load_month_snapshot(month))
+
+    return connection
+
+
+def open_by_component(connection, months):
+    """
+    Open issues per component per snapshot month: {component: {month: count}}.
+    """
+    placeholders = ", ".join("?" for _ in months)
+    rows = connection.execute(
+        f"""
+        SELECT component, month, open_issues FROM open_by_component_month
+        WHERE month IN ({placeholders})
+        ORDER BY component, month
+        """,
+        list(months),
+    )
+
+    component_stats = {}
+
+    for component, month, open_issues in rows:
+        component_stats.setdefault(component, {month: 0 for month in months})
+        component_stats[component][month] = open_issues
+
+    return component_stats
+
+
+def opened_closed(connection, month):
+    """
+    Issues opened and closed per calendar month, as seen by one snapshot.
+    """
+    return connection.execute(
+        "SELECT period, opened, closed FROM opened_closed_by_month WHERE month = ? ORDER BY period",
+        (month,),
+    ).fetchall()
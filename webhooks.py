@@ -0,0 +1,294 @@
+"""
+Local receiver for GitHub `issues` webhooks. Each verified delivery is
+translated into the GraphQL issue shape the fetch stores and normalizes,
+merged with the stored issue and journaled as a delta (see
+`issues.append_delta`), and the dashboard windows are updated in place.
+The next `chart`/`export` compacts the journal into the snapshot.
+
+    python cli.py receive --port 8080 --record data/webhooks.jsonl
+    python cli.py replay data/webhooks.jsonl --url http://127.0.0.1:8080/
+
+Deliveries are signed with the `GITHUB_WEBHOOK_SECRET` secret.
+"""
+import hashlib
+import hmac
+import json
+import os
+import threading
+import urllib.error
+import urllib.request
+
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import windows
+
+from issues import append_delta, delta_paths, load_deltas, partition_path, window_start
+from snapshot import read_snapshot
+
+# The `issues` actions that change what the charts count
+ACTIONS = {"opened", "closed", "labeled", "unlabeled"}
+
+EVENT_TYPES = {"labeled": "LabeledEvent", "unlabeled": "UnlabeledEvent"}
+
+
+def get_secret():
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    secret = os.getenv("GITHUB_WEBHOOK_SECRET")
+
+    if not secret:
+        raise KeyError("GITHUB_WEBHOOK_SECRET is not set")
+
+    return secret
+
+
+def sign(secret, body):
+    """
+    The `X-Hub-Signature-256` header GitHub sends for a body.
+    """
+    return "sha256=" + hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+
+
+def verify_signature(secret, body, signature):
+    return bool(signature) and hmac.compare_digest(sign(secret, body), signature)
+
+
+def translate(payload):
+    """
+    The issue of an `issues` payload in the GraphQL shape, and the timeline
+    event its action adds (None unless it is a label change). Webhooks carry
+    no event time, so label events take the issue's `updated_at`.
+    """
+    issue = payload["issue"]
+    translated = {
+        "id": issue["node_id"],
+        "title": issue["title"],
+        "number": issue["number"],
+        "createdAt": issue["created_at"],
+        "updatedAt": issue["updated_at"],
+        "closedAt": issue.get("closed_at"),
+        "state": issue["state"].upper(),
+        "labels": {"nodes": [{"name": label["name"]} for label in issue.get("labels", [])]},
+        "timelineItems": {"nodes": []},
+    }
+
+    if payload["action"] not in EVENT_TYPES:
+        return translated, None
+
+    return translated, {
+        "__typename": EVENT_TYPES[payload["action"]],
+        "createdAt": issue["updated_at"],
+        "label": {"name": payload["label"]["name"]},
+    }
+
+
+def merge_issue(previous, issue, event):
+    """
+    The new state of a stored issue: the payload's fields and labels plus the
+    stored timeline with the new event appended. None for a delivery older
+    than the stored state, which GitHub does not guarantee to send in order.
+    """
+    if previous and previous["updatedAt"] and previous["updatedAt"] > issue["updatedAt"]:
+        return None
+
+    nodes = list(previous["timelineItems"]["nodes"]) if previous else []
+
+    if event and event not in nodes:
+        nodes.append(event)
+
+    return {**issue, "timelineItems": {"nodes": nodes}}
+
+
+class WebhookReceiver:
+    """
+    Applies verified deliveries to every target of the collection whose repo
+    the issue is in and whose label it carries. Issues that lose the target
+    label stay stored until the next full fetch drops them.
+    """
+
+    def __init__(self, secret, targets, record=None):
+        self.secret = secret
+        self.targets = targets
+        self.record = record
+        self.lock = threading.Lock()
+        self.stats = Counter()
+        # Journaled issues by target and number, so lookups skip the journal
+        self.deltas = {}
+
+    def stored_issue(self, target, number):
+        journal = self.deltas.get(target["name"])
+
+        # The journal was compacted into the snapshot: start over from it
+        if journal is None or not any(os.path.exists(path) for path in delta_paths(target)):
+            journal = self.deltas[target["name"]] = {
+                issue["number"]: issue for issue in load_deltas(target)
+            }
+
+        if number in journal:
+            return journal[number]
+
+        # Read under the snapshot lock, so a compaction swapping the snapshot
+        # in never leaves the issue looking new
+        snapshot = read_snapshot(partition_path(target, "snapshot"), missing_ok=True)
+
+        return snapshot.find(number) if snapshot is not None else None
+
+    def matching_targets(self, payload):
+        repo = payload["repository"]["full_name"]
+        labels = {label["name"] for label in payload["issue"].get("labels", [])}
+
+        return [
+            target for target in self.targets
+            if target["repo"].lower() == repo.lower() and target["label"] in labels
+        ]
+
+    def apply(self, payload):
+        """
+        Journal the delivery's issue for each matching target and update that
+        target's windows. Returns how many targets it was applied to. Issues
+        created before the one-year window are skipped, as compaction would
+        drop them from the snapshot.
+        """
+        issue, event = translate(payload)
+        applied = 0
+
+        if issue["createdAt"][:7] < window_start():
+            return applied
+
+        for target in self.matching_targets(payload):
+            merged = merge_issue(self.stored_issue(target, issue["number"]), issue, event)
+
+            if merged is None:
+                continue
+
+            os.makedirs(target["path"], exist_ok=True)
+            append_delta(merged, target)
+            self.deltas[target["name"]][merged["number"]] = merged
+
+            windows_path = os.path.join(target["path"], "windows.json")
+            aggregator = windows.load_windows(windows_path)
+
+            if aggregator is not None:
+                aggregator.apply(merged)
+                aggregator.evict()
+                windows.save_windows(aggregator, windows_path)
+
+            applied += 1
+
+        return applied
+
+    def handle(self, event_name, body, signature):
+        """
+        Returns (status, message) for one delivery.
+        """
+        if not verify_signature(self.secret, body, signature):
+            self.stats["rejected"] += 1
+            return 401, "invalid signature"
+
+        if event_name == "ping":
+            return 200, "pong"
+
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return 400, "invalid JSON"
+
+        if event_name != "issues" or payload.get("action") not in ACTIONS:
+            self.stats["ignored"] += 1
+            return 202, "ignored"
+
+        with self.lock:
+            if self.record:
+                with open(self.record, "a") as record_file:
+                    record_file.write(json.dumps({"event": event_name, "payload": payload}) + "\n")
+
+            applied = self.apply(payload)
+
+        self.stats["applied" if applied else "skipped"] += 1
+
+        return (200, "applied") if applied else (202, "no matching target, stale or out of window")
+
+
+def make_handler(receiver):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            length = self.headers.get("Content-Length", "")
+
+            if not length.isdigit():
+                # Without a length the body can't be read off a kept-alive connection
+                self.close_connection = True
+                self.respond(411, "Content-Length required")
+                return
+
+            body = self.rfile.read(int(length))
+            self.respond(*receiver.handle(
+                self.headers.get("X-GitHub-Event"), body, self.headers.get("X-Hub-Signature-256")
+            ))
+
+        def respond(self, status, message):
+            content = message.encode("utf-8")
+
+            self.send_response(status)
+            self.send_header("Content-Type", "text/plain")
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def start(receiver, host="127.0.0.1", port=0):
+    """
+    Serve the receiver from a background thread. Returns (server, url).
+    """
+    server = ThreadingHTTPServer((host, port), make_handler(receiver))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    return server, f"http://{host}:{server.server_address[1]}/"
+
+
+def load_recorded(path):
+    with open(path, "r") as record_file:
+        return [json.loads(line) for line in record_file if line.strip()]
+
+
+def post(url, event_name, body, signature):
+    request = urllib.request.Request(url, data=body, method="POST", headers={
+        "Content-Type": "application/json",
+        "X-GitHub-Event": event_name,
+        "X-Hub-Signature-256": signature,
+    })
+
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status
+    except urllib.error.HTTPError as error:
+        return error.code
+
+
+def replay(deliveries, secret, url=None, receiver=None):
+    """
+    Send recorded deliveries ({"event", "payload"}), signed with `secret`, to
+    the receiver at `url`, or hand them straight to a local `receiver`.
+    Returns the count of each response status.
+    """
+    statuses = Counter()
+
+    for delivery in deliveries:
+        body = json.dumps(delivery["payload"]).encode("utf-8")
+        signature = sign(secret, body)
+
+        if url:
+            statuses[post(url, delivery["event"], body, signature)] += 1
+        else:
+            statuses[receiver.handle(delivery["event"], body, signature)[0]] += 1
+
+    return statuses
@@ -0,0 +1,264 @@
+import json
+import os
+
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+
+from buckets import WEEK_SHIFT_DAYS
+from issues import label_epic, label_needs_triage, load_fetch_state
+
+WINDOWS_PATH = "data/windows.json"
+
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+# How many buckets of each unit the dashboards show
+WINDOW_SIZES = {"month": 12, "week": 12}
+
+METRICS = {
+    "opened": "month",
+    "closed": "month",
+    "closed_epics": "month",
+    "triage_needed": "week",
+    "triaged": "week",
+}
+
+
+def month_bucket(timestamp):
+    return timestamp[:7]
+
+
+def week_bucket(timestamp):
+    year, week, _ = date.fromisoformat(timestamp[:10]).isocalendar()
+
+    return f"{year}-W{week:02d}"
+
+
+BUCKETS = {"month": month_bucket, "week": week_bucket}
+
+
+def bucket_code(bucket):
+    """
+    The `buckets.py` period code of a month ("2024-06") or week ("2024-W05") key.
+    """
+    if "-W" in bucket:
+        year, week = bucket.split("-W")
+        days = date.fromisocalendar(int(year), int(week), 1).toordinal() - date(1970, 1, 1).toordinal()
+
+        return (days + WEEK_SHIFT_DAYS) // 7
+
+    year, month = bucket.split("-")
+
+    return (int(year) - 1970) * 12 + int(month) - 1
+
+
+def first_event(issue, event_type, label):
+    for item in issue.get("timelineItems", {}).get("nodes", []):
+        if item["__typename"] == event_type and item.get("label", {}).get("name") == label:
+            return item["createdAt"]
+
+    return None
+
+
+def issue_contributions(issue):
+    """
+    The (metric, bucket) counters a single GraphQL-shaped issue adds to.
+    """
+    labels = {label["name"] for label in issue.get("labels", {}).get("nodes", [])}
+    timestamps = {
+        "opened": issue["createdAt"] if issue["state"] == "OPEN" else None,
+        "closed": issue.get("closedAt") if issue["state"] == "CLOSED" else None,
+        "closed_epics": issue.get("closedAt")
+        if issue["state"] == "CLOSED" and label_epic in labels
+        else None,
+        "triage_needed": first_event(issue, "LabeledEvent", label_needs_triage),
+        "triaged": first_event(issue, "UnlabeledEvent", label_needs_triage),
+    }
+
+    return [
+        [metric, BUCKETS[METRICS[metric]](timestamp)]
+        for metric, timestamp in timestamps.items()
+        if timestamp
+    ]
+
+
+class WindowAggregator:
+    """
+    Per-bucket counters for the 12-month and 12-week dashboards. Issues are
+    applied as deltas: an updated issue first retracts what its previous
+    version contributed, so a refresh costs O(changed issues). `as_of` is
+    the latest date the windows were evicted at and `fetched_at` the fetch of
+    the snapshot they were built from.
+    """
+
+    def __init__(self, counters=None, contributions=None, as_of=None, fetched_at=None):
+        counters = counters or {}
+
+        self.counters = {metric: Counter(counters.get(metric, {})) for metric in METRICS}
+        self.contributions = contributions or {}
+        self.as_of = as_of
+        self.fetched_at = fetched_at
+
+    def _add(self, contributions, sign):
+        for metric, bucket in contributions:
+            self.counters[metric][bucket] += sign
+
+            if self.counters[metric][bucket] <= 0:
+                del self.counters[metric][bucket]
+
+    def apply(self, issue):
+        key = str(issue["number"])
+        previous = self.contributions.get(key)
+
+        if previous:
+            self._add(previous, -1)
+
+        contributions = issue_contributions(issue)
+        self._add(contributions, 1)
+        self.contributions[key] = contributions
+
+    def apply_all(self, issues):
+        for issue in issues:
+            self.apply(issue)
+
+    def remove(self, number):
+        previous = self.contributions.pop(str(number), None)
+
+        if previous:
+            self._add(previous, -1)
+
+    def window(self, unit, as_of=None):
+        """
+        Bucket keys of the window ending at `as_of` (by default now) for a
+        unit, newest first.
+        """
+        now = as_of or datetime.now(timezone.utc)
+        size = WINDOW_SIZES[unit]
+
+        if unit == "month":
+            months = now.year * 12 + now.month - 1
+            return [
+                f"{(months - offset) // 12}-{(months - offset) % 12 + 1:02d}"
+                for offset in range(size)
+            ]
+
+        return [week_bucket((now - timedelta(weeks=offset)).isoformat()) for offset in range(size)]
+
+    def evict(self, as_of=None):
+        """
+        Drop counters for buckets older than the windows ending at `as_of`
+        (by default now), along with the issue contributions that only
+        pointed at evicted buckets. Newer buckets are kept, so the windows
+        stay current for every later date.
+        """
+        as_of = as_of or datetime.now(timezone.utc)
+        oldest = {unit: self.window(unit, as_of)[-1] for unit in WINDOW_SIZES}
+
+        for metric, unit in METRICS.items():
+            for bucket in list(self.counters[metric]):
+                if bucket < oldest[unit]:
+                    del self.counters[metric][bucket]
+
+        for key, contributions in list(self.contributions.items()):
+            contributions = [
+                [metric, bucket]
+                for metric, bucket in contributions
+                if bucket >= oldest[METRICS[metric]]
+            ]
+
+            if contributions:
+                self.contributions[key] = contributions
+            else:
+                del self.contributions[key]
+
+        self.as_of = max(self.as_of or "", as_of.strftime(TIMESTAMP_FORMAT))
+
+    def is_current(self, metric, as_of):
+        """
+        Whether every bucket of the metric's window ending at `as_of` is
+        kept, so `series` gives what counting every stored issue would.
+        """
+        if metric not in METRICS or self.as_of is None:
+            return False
+
+        bucket = BUCKETS[METRICS[metric]]
+
+        return bucket(as_of.strftime(TIMESTAMP_FORMAT)) >= bucket(self.as_of)
+
+    def series(self, metric, as_of=None):
+        """
+        Zero-filled (bucket, count) pairs for the metric's window ending at
+        `as_of` (by default now), newest first.
+        """
+        return [
+            (bucket, self.counters[metric].get(bucket, 0))
+            for bucket in self.window(METRICS[metric], as_of)
+        ]
+
+    def to_json(self):
+        return {
+            "counters": {metric: dict(counter) for metric, counter in self.counters.items()},
+            "contributions": self.contributions,
+            "as_of": self.as_of,
+            "fetched_at": self.fetched_at,
+        }
+
+
+def load_windows(path=WINDOWS_PATH):
+    if not os.path.exists(path):
+        return None
+
+    with open(path, "r") as json_file:
+        return WindowAggregator(**json.load(json_file))
+
+
+def save_windows(aggregator, path=WINDOWS_PATH):
+    with open(path, "w") as json_file:
+        json.dump(aggregator.to_json(), json_file)
+
+
+def target_windows_path(target=None):
+    return os.path.join(target["path"], "windows.json") if target else WINDOWS_PATH
+
+
+def update_windows(fetched_issues, issues, incremental, target=None, as_of=None, path=None):
+    """
+    Apply a fetch to the stored windows: deltas after an incremental fetch,
+    a rebuild from every issue otherwise. Matches the `on_fetched` callback of
+    `issues.collect_issues`; each target keeps its windows in its partition.
+    """
+    path = path or target_windows_path(target)
+    aggregator = load_windows(path) if incremental else None
+
+    if aggregator is None:
+        aggregator = WindowAggregator()
+        aggregator.apply_all(issues)
+    else:
+        aggregator.apply_all(fetched_issues)
+
+        # Issues that aged out of the stored one-year window
+        numbers = {str(issue["number"]) for issue in issues}
+
+        for key in [key for key in aggregator.contributions if key not in numbers]:
+            aggregator.remove(key)
+
+    aggregator.evict(as_of)
+    state = load_fetch_state(target) if target else None
+    aggregator.fetched_at = state["fetchedAt"] if state else None
+    save_windows(aggregator, path)
+
+    return aggregator
+
+
+def current_windows(target):
+    """
+    The target's stored windows if they were built from its current snapshot,
+    else None. Whether they keep the window ending at a given date is up to
+    `WindowAggregator.is_current`.
+    """
+    aggregator = load_windows(target_windows_path(target))
+    state = load_fetch_state(target)
+
+    if aggregator is None or state is None or aggregator.fetched_at != state["fetchedAt"]:
+        return None
+
+    return aggregator